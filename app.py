@@ -1,64 +1,59 @@
 import streamlit as st
-import pandas as pd
-from functools import reduce
+from inventory import ProductStore, SNAPSHOT_PATH, cached_view, load_csv, load_snapshot, operations, save_csv, save_snapshot, search_products
+from inventory.auth import check_credentials
+from product_table import render_product_table
 
 # Dummy user credentials (in a real application, you'd use a database)
-USER_CREDENTIALS = {"admin": "password123"}
+USER_CREDENTIALS = {"admin": {"password": "password123", "role": "admin"}}
 
-# Global product dictionary to store product information
+# Global product store (see inventory/product_store.py) holding product information
 if 'products' not in st.session_state:
-    st.session_state.products = {}
+    st.session_state.products = ProductStore()
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
 
 # Function to handle product input
 def input_products(product_name, price, quantity):
-    if product_name and price > 0 and quantity > 0:
-        st.session_state.products[product_name] = {'price': price, 'quantity': quantity}
-        st.success(f"Product '{product_name}' added successfully!")
-        update_product_list()
+    try:
+        product_name = operations.add_product(st.session_state.products, product_name, price, quantity)
+    except ValueError as error:
+        st.error(str(error))
     else:
-        st.error("Please fill all fields with valid data.")
+        st.success(f"Product '{product_name}' added successfully!")
 
-# Function to update the product list displayed in the GUI
+# Function to render the product list as one paginated table (only the visible page is sent)
 def update_product_list():
-    if st.session_state.products:
-        st.write("**Product List:**")
-        for product, info in st.session_state.products.items():
-            st.write(f"{product}: Price = {info['price']}, Quantity = {info['quantity']}")
-    else:
-        st.write("No products available.")
+    render_product_table(st.session_state.products)
 
 # Function to handle product selection and purchase
 def select_product(selected_product):
-    if selected_product and st.session_state.products[selected_product]['quantity'] > 0:
-        st.session_state.products[selected_product]['quantity'] -= 1
+    try:
+        purchased = operations.purchase(st.session_state.products, selected_product)
+    except ValueError as error:
+        st.error(str(error))
+        return
+    if purchased:
         st.success(f"Thank you for purchasing {selected_product}.")
-        update_product_list()
-    elif selected_product:
-        st.error(f"{selected_product} is out of stock.")
     else:
-        st.error("Please select a product.")
+        st.error(f"{selected_product} is out of stock.")
 
 # Function to apply a discount to all products
 def apply_discount(discount_percentage):
-    if 0 <= discount_percentage <= 100:
-        discount_factor = 1 - discount_percentage / 100
-        for product in st.session_state.products.keys():
-            st.session_state.products[product]['price'] = round(st.session_state.products[product]['price'] * discount_factor, 2)
-        st.success(f"Discount of {discount_percentage}% applied to all products.")
-        update_product_list()
+    try:
+        operations.apply_discount(st.session_state.products, discount_percentage)
+    except ValueError as error:
+        st.error(str(error))
     else:
-        st.error("Please enter a valid discount percentage (0-100).")
+        st.success(f"Discount of {discount_percentage}% applied to all products.")
 
 # Function to calculate total stock value
 def calculate_total_stock_value():
-    total_value = reduce(lambda acc, product: acc + (product['price'] * product['quantity']), st.session_state.products.values(), 0)
+    total_value = st.session_state.products.total_stock_value()
     st.info(f"Total stock value: ${total_value:.2f}")
 
 # Function to filter out-of-stock products
 def filter_out_of_stock():
-    out_of_stock_products = [p for p in st.session_state.products if st.session_state.products[p]['quantity'] == 0]
+    out_of_stock_products = cached_view(st.session_state.products, "out_of_stock", ProductStore.out_of_stock)
     if out_of_stock_products:
         st.info(f"Out of stock products: {', '.join(out_of_stock_products)}")
     else:
@@ -67,25 +62,46 @@ def filter_out_of_stock():
 # Function to save products to a CSV file
 def save_to_csv():
     if st.session_state.products:
-        df = pd.DataFrame(st.session_state.products).T  # Convert to DataFrame and transpose for proper format
-        df.to_csv("products.csv")
+        save_csv(st.session_state.products)
         st.success("Products saved to 'products.csv'.")
     else:
         st.error("No products to save.")
 
-# Function to load products from a CSV file
+# Function to load products from a CSV file (streamed in chunks, gzip accepted)
 def load_from_csv():
+    progress_bar = st.progress(0.0, text="Loading products...")
     try:
-        df = pd.read_csv("products.csv", index_col=0)
-        st.session_state.products = df.T.to_dict()  # Convert DataFrame back to dictionary
+        result = load_csv("products.csv", progress=lambda fraction, rows: progress_bar.progress(fraction, text=f"Loaded {rows} products..."))
+        st.session_state.products = result.store
         st.success("Products loaded from 'products.csv'.")
-        update_product_list()
+        if result.rows_rejected:
+            st.warning(f"Skipped {result.rows_rejected} invalid rows.")
     except FileNotFoundError:
         st.error("'products.csv' not found.")
+    except ValueError as error:
+        st.error(f"Could not load 'products.csv': {error}")
+    finally:
+        progress_bar.empty()
+
+# Function to save products to a binary snapshot (keeps dtypes, memory-mapped on load)
+def save_snapshot_file():
+    if st.session_state.products:
+        save_snapshot(st.session_state.products)
+        st.success(f"Products saved to '{SNAPSHOT_PATH}'.")
+    else:
+        st.error("No products to save.")
+
+# Function to load products from a binary snapshot
+def load_snapshot_file():
+    try:
+        st.session_state.products = load_snapshot()
+        st.success(f"Products loaded from '{SNAPSHOT_PATH}'.")
+    except FileNotFoundError:
+        st.error(f"'{SNAPSHOT_PATH}' not found.")
 
 # Login function
 def login(username, password):
-    if username in USER_CREDENTIALS and USER_CREDENTIALS[username] == password:
+    if check_credentials(USER_CREDENTIALS, username, password):
         st.session_state.logged_in = True
         st.success("Login successful!")
     else:
@@ -125,7 +141,9 @@ else:
         # Product Purchase Section
         st.header("Purchase Product")
         if st.session_state.products:
-            selected_product = st.selectbox("Select a Product to Purchase", list(st.session_state.products.keys()))
+            # Only the best matches for the search go into the selectbox
+            search = st.text_input("Search products", key="purchase_search")
+            selected_product = st.selectbox("Select a Product to Purchase", cached_view(st.session_state.products, "search", search_products, search))
             if st.button("Purchase"):
                 select_product(selected_product)
         else:
@@ -152,6 +170,10 @@ else:
             save_to_csv()
         if st.button("Load from CSV"):
             load_from_csv()
+        if st.button("Save Snapshot"):
+            save_snapshot_file()
+        if st.button("Load Snapshot"):
+            load_snapshot_file()
 
     # Product List Section
     st.header("Product List")
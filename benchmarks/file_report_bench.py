@@ -0,0 +1,58 @@
+# Scaling benchmark for the out-of-core file reports: time report_file on one synthetic
+# products CSV with 1, 2, 4, ... worker processes and compare against loading the file
+# into a ProductStore. Peak memory is the largest resident set of any worker.
+#
+#   python -m benchmarks.file_report_bench --rows 20000000
+#   python -m benchmarks.file_report_bench --rows 1000000 --workers 1 2 4 8 --skip-load
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.synthetic import write_products_csv
+from inventory import load_csv
+from inventory.file_reports import report_file
+
+
+# Function to list the default worker counts: powers of two up to the number of CPUs
+def default_workers():
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+# Function to get the peak resident memory of finished child processes, in MiB
+def peak_child_mib():
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel file reports against loading the file.")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--skip-load", action="store_true", help="don't time load_csv for comparison")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "products.csv")
+        write_products_csv(path, args.rows)
+        print(f"{args.rows:,} rows, {os.path.getsize(path) / 2 ** 20:.0f} MiB")
+
+        baseline = None
+        for workers in args.workers:
+            report = report_file(path, workers)
+            baseline = baseline or report.elapsed
+            print(f"report_file workers={workers:<3} {report.elapsed:8.2f} s  speedup {baseline / report.elapsed:5.2f}x  "
+                  f"peak worker RSS {peak_child_mib():6.0f} MiB")
+
+        if not args.skip_load:
+            started = time.perf_counter()
+            store = load_csv(path).store
+            store.total_stock_value()
+            store.out_of_stock()
+            print(f"load_csv + store reports    {time.perf_counter() - started:8.2f} s")
@@ -0,0 +1,157 @@
+# Micro-benchmarks for the headless inventory and auth operations at several catalog sizes.
+#
+#   python -m benchmarks.operations_bench                                # 1k, 100k and 1M products
+#   python -m benchmarks.operations_bench --sizes 1000 100000 --json baseline.json
+#   python -m benchmarks.operations_bench --compare baseline.json        # exit 1 on regressions
+#
+# Each operation is timed with timeit (best of --repeat runs) and reported per call.
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import product_columns, synthetic_users
+from inventory import ProductStore, auth, load_csv, load_snapshot, operations, report_index, save_csv, save_snapshot, search_products
+from inventory.passwords import hash_password
+from inventory.sales_events import SalesHistory
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+# A result slower than the baseline by more than this factor is a regression
+TOLERANCE = 1.25
+# Number of catalog rows the per-item benchmarks cycle through
+SAMPLE_ROWS = 1000
+
+
+# Function to time `func`, returning the best seconds per call.
+# Without `number`, timeit calibrates how many calls make up one run.
+def measure(func, repeat, number=None):
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+# Function to list the benchmarks for one catalog size as (name, func, number) tuples;
+# number=1 marks heavy operations that are timed one call per run
+def benchmarks_for(size, workdir):
+    names, prices, quantities = product_columns(size)
+    store = ProductStore.from_columns(names, prices, quantities)
+    # Purchases run against a copy with unlimited stock so they never hit the sold-out path
+    stocked = ProductStore.from_columns(names, prices, np.full(size, 10 ** 12, dtype=np.int64))
+    sample = itertools.cycle(names[::max(size // SAMPLE_ROWS, 1)])
+    cart = {name: 1 for name in names[:5]}
+    new_names = (f"New Product {i}" for i in itertools.count())
+    # Not subscribed to the store, so the purchase benchmarks don't pay for it
+    history = SalesHistory(store)
+    users = synthetic_users(min(size, 100_000))
+    credentials = {username: {"password": password, "role": "customer"} for username, password in users}
+    username, password = users[len(users) // 2]
+    csv_path = os.path.join(workdir, f"products-{size}.csv")
+    snapshot_path = os.path.join(workdir, f"products-{size}.snapshot")
+    # Build the lazily created indexes up front, so their queries are timed warm
+    search_products(store, "smart")
+    search_products(store, "keybaord")
+    report_index(store).top("value", 1)
+
+    return [
+        ("catalog.build", lambda: ProductStore.from_columns(names, prices, quantities), 1),
+        ("store.total_stock_value", store.total_stock_value, None),
+        ("store.out_of_stock", store.out_of_stock, None),
+        ("search.prefix", lambda: search_products(store, "smart la"), None),
+        ("search.substring", lambda: search_products(store, "lamp 12"), None),
+        ("search.fuzzy", lambda: search_products(store, "wireles mouse"), None),
+        ("search.no_match", lambda: search_products(store, "qqqxzj"), None),
+        ("reports.top_100_value", lambda: report_index(store).top("value", 100), None),
+        ("reports.price_between", lambda: report_index(store).between("price", 10, 20, limit=100), None),
+        ("reports.top_10_after_add", lambda: (store.add(next(new_names), 9.99, 10), report_index(store).top("value", 10)),
+         None),
+        ("operations.purchase", lambda: operations.purchase(stocked, next(sample)), None),
+        ("operations.checkout_5", lambda: operations.checkout(stocked, dict(cart)), None),
+        ("sales.record", lambda: history.record(next(sample), 1), None),
+        ("sales.top_sellers_1h", lambda: history.top_sellers(3600, 20), None),
+        ("operations.add_product", lambda: operations.add_product(store, next(new_names), 9.99, 10), None),
+        ("operations.apply_discount", lambda: operations.apply_discount(store, 0), None),
+        ("operations.revert_discount", lambda: operations.revert_discount(store), None),
+        # A real discount followed by the first read, which computes the sale prices
+        ("store.discounted_prices", lambda: (store.apply_discount(10), store.prices, store.revert_discount()), None),
+        ("csv.save", lambda: save_csv(store, csv_path), 1),
+        ("csv.load", lambda: load_csv(csv_path), 1),
+        ("snapshot.save", lambda: save_snapshot(store, snapshot_path), 1),
+        ("snapshot.load", lambda: load_snapshot(snapshot_path), 1),
+        ("auth.check_credentials", lambda: auth.check_credentials(credentials, username, password, "customer"), None),
+        ("auth.hash_password", lambda: hash_password(password), None),
+    ]
+
+
+# Function to run every benchmark at every size: returns {size: {benchmark: seconds per call}}
+def run(sizes, repeat, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            results[size] = {}
+            for name, func, number in benchmarks_for(size, workdir):
+                if only and not any(pattern in name for pattern in only):
+                    continue
+                results[size][name] = measure(func, repeat, number)
+                print(f"  {size:>9} {name:<26} {format_seconds(results[size][name]):>10}", file=sys.stderr)
+    return results
+
+
+# Function to format seconds with a readable unit
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+# Function to print results as one row per benchmark and one column per size
+def print_table(results):
+    sizes = list(results)
+    benchmarks = list(dict.fromkeys(name for timings in results.values() for name in timings))
+    print(f"{'benchmark':<26}" + "".join(f"{size:>14,}" for size in sizes))
+    for name in benchmarks:
+        cells = (format_seconds(results[size][name]) if name in results[size] else "-" for size in sizes)
+        print(f"{name:<26}" + "".join(f"{cell:>14}" for cell in cells))
+
+
+# Function to compare results against a baseline; returns the regressions as text lines
+def compare(results, baseline, tolerance=TOLERANCE):
+    regressions = []
+    for size, timings in results.items():
+        for name, seconds in timings.items():
+            before = baseline.get(str(size), {}).get(name)
+            if before and seconds > before * tolerance:
+                regressions.append(f"{name} at {size:,} products: {format_seconds(before)} -> "
+                                   f"{format_seconds(seconds)} ({seconds / before:.2f}x)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the inventory operations at several catalog sizes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (best is kept)")
+    parser.add_argument("--only", nargs="+", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.only)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as results_file:
+            json.dump({str(size): timings for size, timings in results.items()}, results_file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for line in regressions:
+            print("REGRESSION:", line)
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.tolerance:.2f}x.")
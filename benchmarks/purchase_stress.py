@@ -0,0 +1,79 @@
+# Stress benchmark: fire thousands of parallel purchases and check that stock never
+# goes negative and that every successful purchase is accounted for.
+#
+#   python -m benchmarks.purchase_stress --backend memory
+#   MONGO_URI=mongodb://localhost:27017 python -m benchmarks.purchase_stress --backend mongo
+#
+# The mongo backend needs a real mongod for multi-threaded runs (mongomock is not thread-safe).
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from inventory.product_store import ProductStore
+from inventory.purchase_engine import PurchaseEngine
+
+
+# Function to build the engine under test with `products` items of `stock` units each
+def build_engine(backend, products, stock):
+    names = [f"product-{i}" for i in range(products)]
+    store = ProductStore.from_columns(names, [9.99] * products, [stock] * products)
+    if backend == "memory":
+        return PurchaseEngine(store), names
+
+    from inventory.mongo_pool import get_collection
+    collection = get_collection("stress_products")
+    collection.drop()
+    collection.create_index("name", unique=True)
+    collection.insert_many([{"name": name, "price": 9.99, "quantity": stock} for name in names])
+    return PurchaseEngine(store, collection), names
+
+
+# Function to run `purchases` random purchases across `threads` workers
+def run(backend, products, stock, threads, purchases, max_quantity, seed):
+    engine, names = build_engine(backend, products, stock)
+    rng = random.Random(seed)
+    orders = [(rng.choice(names), rng.randint(1, max_quantity)) for _ in range(purchases)]
+
+    def buy(order):
+        name, quantity = order
+        return name, quantity, engine.purchase(name, quantity)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(buy, orders, chunksize=64))
+    elapsed = time.perf_counter() - started
+
+    sold = {}
+    for name, quantity, ok in results:
+        if ok:
+            sold[name] = sold.get(name, 0) + quantity
+
+    if engine.collection is not None:
+        remaining = {p["name"]: p["quantity"] for p in engine.collection.find({}, {"_id": 0, "name": 1, "quantity": 1})}
+    else:
+        remaining = {name: engine.store.quantity(name) for name in names}
+
+    negative = [name for name, quantity in remaining.items() if quantity < 0]
+    mismatched = [name for name in names if remaining[name] != stock - sold.get(name, 0)]
+    successes = sum(1 for _, _, ok in results if ok)
+    print(f"{backend}: {purchases} purchases on {threads} threads in {elapsed:.2f}s "
+          f"({purchases / elapsed:.0f}/s), {successes} succeeded, {sum(sold.values())} units sold")
+    if negative or mismatched:
+        raise SystemExit(f"FAILED: negative stock for {negative[:10]}, lost updates for {mismatched[:10]}")
+    if engine.collection is None:
+        engine.store.check_aggregates()
+    print("OK: stock never went negative and every sale is accounted for.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--purchases", type=int, default=20000)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.backend, args.products, args.stock, args.threads, args.purchases, args.max_quantity, args.seed)
@@ -0,0 +1,58 @@
+# Synthetic, reproducible data for the benchmarks: product catalogs and customer
+# accounts of any size, generated from a seed.
+import csv
+import random
+
+import numpy as np
+
+from inventory import ProductStore
+
+ADJECTIVES = ["Basic", "Classic", "Compact", "Deluxe", "Eco", "Ergonomic", "Heavy-Duty", "Mini",
+              "Portable", "Premium", "Pro", "Smart", "Ultra", "Vintage", "Wireless"]
+NOUNS = ["Blender", "Cable", "Chair", "Charger", "Desk", "Headphones", "Keyboard", "Kettle", "Lamp",
+         "Monitor", "Mouse", "Speaker", "Tablet", "Toaster", "Webcam"]
+# Share of generated products that are out of stock
+OUT_OF_STOCK_SHARE = 0.05
+
+
+# Function to generate `count` unique product names like "Smart Lamp 1234"
+def product_names(count, seed=0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}" for i in range(count)]
+
+
+# Function to generate (names, prices, quantities) columns for `count` products
+def product_columns(count, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = np.round(rng.uniform(0.5, 500.0, count), 2)
+    quantities = rng.integers(1, 200, count)
+    quantities[rng.random(count) < OUT_OF_STOCK_SHARE] = 0
+    return product_names(count, seed), prices, quantities
+
+
+# Function to build a ProductStore holding `count` synthetic products
+def synthetic_catalog(count, seed=0):
+    return ProductStore.from_columns(*product_columns(count, seed))
+
+
+# Function to generate `count` (username, password) pairs
+def synthetic_users(count, seed=0):
+    rng = random.Random(seed)
+    return [(f"customer{i}", f"pw-{rng.getrandbits(48):012x}") for i in range(count)]
+
+
+# Function to write a products CSV in the format the apps load
+def write_products_csv(path, count, seed=0):
+    names, prices, quantities = product_columns(count, seed)
+    with open(path, "w", newline="", encoding="utf-8") as products_file:
+        writer = csv.writer(products_file)
+        writer.writerow(["", "price", "quantity"])
+        writer.writerows(zip(names, prices.tolist(), quantities.tolist()))
+
+
+# Function to write a users CSV in the format the customer import accepts
+def write_users_csv(path, count, seed=0):
+    with open(path, "w", newline="", encoding="utf-8") as users_file:
+        writer = csv.writer(users_file)
+        writer.writerow(["username", "password"])
+        writer.writerows(synthetic_users(count, seed))
@@ -0,0 +1,82 @@
+# Throughput benchmark for the user store backends: registrations and logins per second
+# on MongoDB and on SQLite, through the same register_customer/authenticate_customer
+# calls the app makes. Logins are timed uncached (one store lookup each) and through the
+# login cache (inventory/user_cache.py).
+#
+#   python -m benchmarks.user_store_bench --users 5000
+#   MONGO_URI=mongodb+srv://... python -m benchmarks.user_store_bench --backends mongo sqlite
+#
+# The mongo backend writes to a scratch "bench_users" collection of MONGO_URI's database
+# (mongomock:// runs it in memory); the sqlite backend uses a temporary file.
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_users
+from inventory.auth import authenticate_customer, register_customer
+from inventory.user_cache import UserCache
+from inventory.user_store import MongoUserStore, SQLiteUserStore
+
+# Customers the timed logins are drawn from
+RETURNING_USERS = 100
+
+
+# Function to open an empty user store of the given backend
+def open_store(backend, workdir):
+    if backend == "sqlite":
+        return SQLiteUserStore(os.path.join(workdir, "bench_users.sqlite3"))
+    from inventory.mongo_pool import get_collection
+    collection = get_collection("bench_users")
+    collection.drop()
+    collection.create_index("username", unique=True)
+    return MongoUserStore(collection)
+
+
+# Function to call `func` once per item, returning calls per second
+def throughput(func, items):
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return len(items) / (time.perf_counter() - started)
+
+
+# Function to benchmark one backend: returns {benchmark: calls per second}
+def run(backend, users, logins, workdir, seed=0):
+    store = open_store(backend, workdir)
+    rng = random.Random(seed)
+    # Repeat logins of a few customers, as during a sales peak
+    regulars = users[:RETURNING_USERS]
+    returning = [regulars[rng.randrange(len(regulars))] for _ in range(logins)]
+    cache = UserCache()
+    try:
+        return {
+            "register": throughput(lambda user: register_customer(store, user[0], user[1], cache=None), users),
+            "login": throughput(lambda user: authenticate_customer(store, user[0], user[1], cache=None), returning),
+            "login (cached)": throughput(lambda user: authenticate_customer(store, user[0], user[1], cache), returning),
+            "login unknown user": throughput(lambda user: authenticate_customer(store, user[0] + "-x", user[1], cache=None),
+                                             returning),
+        }
+    finally:
+        if backend == "mongo":
+            store.collection.drop()
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare login/registration throughput of the user store backends.")
+    parser.add_argument("--backends", nargs="+", choices=["mongo", "sqlite"], default=["mongo", "sqlite"])
+    parser.add_argument("--users", type=int, default=2000, help="accounts registered per backend")
+    parser.add_argument("--logins", type=int, default=5000, help="logins timed per backend")
+    args = parser.parse_args()
+
+    users = synthetic_users(args.users)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends:
+            results[backend] = run(backend, users, args.logins, workdir)
+
+    print(f"{'calls/s':<20}" + "".join(f"{backend:>12}" for backend in args.backends))
+    for name in results[args.backends[0]]:
+        print(f"{name:<20}" + "".join(f"{results[backend][name]:>12,.0f}" for backend in args.backends))
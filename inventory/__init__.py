@@ -0,0 +1,37 @@
+# Headless inventory and auth logic shared by the Streamlit and Tkinter front ends.
+# Nothing here touches a UI, so every operation can be imported, scripted and timed
+# (see benchmarks/). The MongoDB-backed modules (mongo_pool, product_catalog,
+# purchase_engine) and the customer account modules (user_store, user_import) are
+# imported from their own modules, so the local front ends never need a database driver.
+import importlib
+
+# Names re-exported from the submodules, as {name: submodule}. They are imported on
+# first access, so importing one module (inventory.startup, inventory.auth) doesn't pay
+# for numpy and the rest of the package; `from inventory import X` works as before.
+_EXPORTS = {
+    "ProductStore": "product_store",
+    "CsvLoadResult": "product_csv",
+    "load_csv": "product_csv",
+    "save_csv": "product_csv",
+    "csv_bytes": "product_csv",
+    "SNAPSHOT_PATH": "product_snapshot",
+    "load_snapshot": "product_snapshot",
+    "save_snapshot": "product_snapshot",
+    "search_products": "product_search",
+    "report_index": "product_reports",
+    "sales_history": "sales_events",
+    "cached_view": "view_cache",
+    "auth": "auth",
+    "operations": "operations",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module("." + module_name, __name__)
+    value = module if module_name == name else getattr(module, name)
+    globals()[name] = value
+    return value
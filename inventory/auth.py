@@ -0,0 +1,40 @@
+from .passwords import hash_password
+from .user_cache import USER_CACHE
+
+
+# Function to normalise a username the way accounts are stored (no spaces)
+def normalize_username(username):
+    return (username or "").replace(" ", "")
+
+
+# Function to check a username/password against a {username: {"password", "role"}} table.
+# Returns the user's role, or None when the credentials (or the requested role) don't match.
+def check_credentials(credentials, username, password, role=None):
+    user = credentials.get(username)
+    if user is None or user["password"] != password:
+        return None
+    if role is not None and user["role"] != role:
+        return None
+    return user["role"]
+
+
+# Function to create a customer account in a user store (see inventory/user_store.py).
+# Returns False when the username is taken (the unique username index rejects it).
+def register_customer(users, username, password, cache=USER_CACHE):
+    username = normalize_username(username)
+    if not username or not password:
+        raise ValueError("Username and password are required.")
+    try:
+        return users.insert(username, hash_password(password), "customer")
+    finally:
+        # The username may be cached as unknown from an earlier login attempt
+        if cache is not None:
+            cache.invalidate(users, username)
+
+
+# Function to check a customer's password against a user store, which returns only the
+# hash and role. Records are looked up through `cache` (see inventory/user_cache.py), so
+# a repeat login doesn't query the store; pass cache=None to always query.
+def authenticate_customer(users, username, password, cache=USER_CACHE):
+    user = users.find(username) if cache is None else cache.get(users, username, lambda: users.find(username))
+    return user is not None and user.get("role") == "customer" and user["password"] == hash_password(password)
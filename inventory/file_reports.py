@@ -0,0 +1,184 @@
+# Out-of-core reports over a products CSV too big to load: total stock value and units,
+# the out-of-stock products and a price histogram, computed without building a store.
+#
+#   python -m inventory.file_reports supplier-products.csv --workers 8
+#
+# The file is split into byte ranges that start and end on line breaks. Worker processes
+# each parse their ranges BLOCK_BYTES at a time, validate the rows like load_csv does and
+# reduce them to partial aggregates, which are merged as they arrive. Memory per worker is
+# bounded by the block size, and the work spreads over as many cores as there are workers.
+# Every row counts as one product (a name repeated in the file is counted each time), and
+# quoted names must not contain line breaks. Gzip-compressed files can't be split by byte
+# range, so they are streamed by a single worker.
+import argparse
+import csv
+import gzip
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .product_csv import CHUNK_ROWS, GZIP_MAGIC, check_columns, validate_chunk
+from .product_store import column_aggregates
+
+# Bytes parsed at a time by each worker
+BLOCK_BYTES = 32 * 1024 * 1024
+# Byte ranges per worker; more, smaller ranges even out the load across workers
+RANGES_PER_WORKER = 4
+# Lower price bounds of the price histogram buckets (the last bucket is open-ended)
+PRICE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+COLUMNS = ["name", "price", "quantity"]
+
+
+# Aggregates of (part of) a products file; partial reports are merged into the total
+class FileReport:
+    def __init__(self, price_buckets=PRICE_BUCKETS):
+        self.rows = 0
+        self.rows_rejected = 0
+        self.total_value = 0.0
+        self.total_units = 0
+        self.out_of_stock = []
+        self.price_buckets = tuple(price_buckets)
+        self.price_counts = np.zeros(len(self.price_buckets), dtype=np.int64)
+        self.elapsed = 0.0
+
+    # Function to fold another (partial) report into this one
+    def merge(self, other):
+        self.rows += other.rows
+        self.rows_rejected += other.rows_rejected
+        self.total_value += other.total_value
+        self.total_units += other.total_units
+        self.out_of_stock.extend(other.out_of_stock)
+        self.price_counts += other.price_counts
+
+    # Function to add one parsed chunk of rows (a DataFrame indexed by name)
+    def add_chunk(self, chunk):
+        names, prices, quantities, rejected = validate_chunk(chunk)
+        total_value, total_units, out_of_stock_rows = column_aggregates(prices, quantities)
+        self.rows += len(names)
+        self.rows_rejected += rejected
+        self.total_value += total_value
+        self.total_units += total_units
+        self.out_of_stock.extend(names[row] for row in out_of_stock_rows.tolist())
+        buckets = np.searchsorted(self.price_buckets, prices, side="right") - 1
+        self.price_counts += np.bincount(buckets, minlength=len(self.price_buckets))
+
+    # Price histogram as (bucket label, products) pairs
+    def price_histogram(self):
+        bounds = self.price_buckets
+        labels = [f"{low}-{high}" for low, high in zip(bounds, bounds[1:])] + [f"{bounds[-1]}+"]
+        return list(zip(labels, self.price_counts.tolist()))
+
+
+# Function to parse CSV bytes holding whole data lines into a DataFrame indexed by name
+def _parse_block(block):
+    import pandas as pd
+
+    return pd.read_csv(io.BytesIO(block), header=None, names=COLUMNS, index_col=0)
+
+
+# Function to split the data lines of a file (after `data_start`) into about `count`
+# byte ranges, each starting and ending on a line break
+def split_byte_ranges(path, count, data_start=0):
+    size = os.path.getsize(path)
+    starts = [data_start]
+    with open(path, "rb") as raw:
+        for i in range(1, count):
+            offset = data_start + (size - data_start) * i // count
+            # Resume after the line break at or after `offset`
+            raw.seek(max(offset - 1, data_start))
+            raw.readline()
+            if starts[-1] < raw.tell() < size:
+                starts.append(raw.tell())
+    return list(zip(starts, starts[1:] + [size]))
+
+
+# Worker: report on the lines in [start, end) of an uncompressed file, a block at a time
+def report_byte_range(path, start, end, block_bytes=BLOCK_BYTES, price_buckets=PRICE_BUCKETS):
+    report = FileReport(price_buckets)
+    with open(path, "rb") as raw:
+        raw.seek(start)
+        remaining = end - start
+        carry = b""
+        while remaining > 0:
+            block = carry + raw.read(min(block_bytes, remaining))
+            remaining = end - raw.tell()
+            # Only whole lines are parsed; a partial last line waits for the next block
+            cut = len(block) if remaining <= 0 else block.rfind(b"\n") + 1
+            carry = block[cut:]
+            if block[:cut].strip():
+                report.add_chunk(_parse_block(block[:cut]))
+    return report
+
+
+# Function to stream a gzip-compressed file through one report, CHUNK_ROWS rows at a time
+def _report_gzip(path, price_buckets, progress):
+    import pandas as pd
+
+    report = FileReport(price_buckets)
+    total_bytes = os.path.getsize(path) or 1
+    with open(path, "rb") as raw:
+        for index, chunk in enumerate(pd.read_csv(gzip.GzipFile(fileobj=raw), index_col=0, chunksize=CHUNK_ROWS)):
+            if index == 0:
+                check_columns(chunk.columns)
+            report.add_chunk(chunk)
+            if progress is not None:
+                progress(min(raw.tell() / total_bytes, 1.0), report.rows)
+    return report
+
+
+# Function to report on a products CSV (the format save_csv writes) in parallel.
+# `workers` defaults to the number of CPUs. `progress(fraction, rows)` is called as
+# ranges finish; an exception raised from it cancels the ranges not yet started.
+# The out-of-stock names are returned sorted, like ProductStore.out_of_stock().
+def report_file(path, workers=None, block_bytes=BLOCK_BYTES, price_buckets=PRICE_BUCKETS, progress=None):
+    started = time.perf_counter()
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == GZIP_MAGIC
+        raw.seek(0)
+        header = raw.readline()
+        data_start = raw.tell()
+
+    if compressed:
+        report = _report_gzip(path, price_buckets, progress)
+    else:
+        # The data lines are parsed by position, as COLUMNS
+        check_columns(next(csv.reader([header.decode("utf-8", "replace")]), [])[1:])
+        workers = workers or os.cpu_count() or 1
+        ranges = split_byte_ranges(path, workers * RANGES_PER_WORKER, data_start)
+        total_bytes = max(os.path.getsize(path) - data_start, 1)
+        report = FileReport(price_buckets)
+        done_bytes = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(report_byte_range, path, start, end, block_bytes, price_buckets): end - start
+                       for start, end in ranges}
+            try:
+                for future in as_completed(futures):
+                    report.merge(future.result())
+                    done_bytes += futures[future]
+                    if progress is not None:
+                        progress(done_bytes / total_bytes, report.rows)
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    report.out_of_stock.sort()
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report on a products CSV without loading it into memory.")
+    parser.add_argument("path", help="products CSV (optionally gzip-compressed)")
+    parser.add_argument("--workers", type=int, default=None, help="report processes (default: one per CPU)")
+    parser.add_argument("--block-bytes", type=int, default=BLOCK_BYTES, help="bytes parsed at a time per worker")
+    args = parser.parse_args()
+
+    result = report_file(args.path, args.workers, args.block_bytes)
+    print(f"Products: {result.rows} ({result.rows_rejected} invalid rows skipped) in {result.elapsed:.2f}s")
+    print(f"Total stock value: ${result.total_value:.2f}")
+    print(f"Total units: {result.total_units}")
+    print(f"Out of stock: {len(result.out_of_stock)} products")
+    for label, count in result.price_histogram():
+        print(f"  price {label:>10}: {count}")
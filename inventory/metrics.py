@@ -0,0 +1,229 @@
+# Hot-path metrics: call counts, errors and latency histograms per operation, kept in
+# process and exported in Prometheus text format.
+#
+#   with timed("load_from_csv"): ...        # or as a decorator: @timed("authenticate")
+#
+# Set METRICS_PORT to serve http://METRICS_HOST:METRICS_PORT/metrics, and/or METRICS_FILE
+# to rewrite that file every METRICS_FILE_INTERVAL seconds (e.g. for node_exporter's
+# textfile collector). Both are started by start_exporter(), once per process.
+import atexit
+import bisect
+import collections
+import contextlib
+import http.server
+import logging
+import math
+import os
+import threading
+import time
+
+# Latency histogram buckets in seconds (the Prometheus "le" bounds)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Most recent samples kept per operation for the p50/p95/p99 percentiles
+RECENT_SAMPLES = int(os.environ.get("METRICS_RECENT_SAMPLES", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "inventory_operation"
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.environ.get("METRICS_PORT")
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_FILE_INTERVAL = float(os.environ.get("METRICS_FILE_INTERVAL", "15"))
+
+logger = logging.getLogger(__name__)
+
+
+# Counts, errors and latencies of one operation. The bucket counts cover every call
+# since start; the percentiles come from the RECENT_SAMPLES most recent calls.
+class LatencyHistogram:
+    def __init__(self, recent_samples=RECENT_SAMPLES):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.recent = collections.deque(maxlen=recent_samples)
+        self._lock = threading.Lock()
+
+    # Function to record one call that took `seconds`
+    def observe(self, seconds, error=False):
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            if error:
+                self.errors += 1
+            if bucket < len(BUCKETS):
+                self.bucket_counts[bucket] += 1
+            self.recent.append(seconds)
+
+    # Function to get the nearest-rank percentiles of the recent calls (None before any call)
+    def percentiles(self, quantiles=QUANTILES):
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return [None] * len(quantiles)
+        return [samples[max(math.ceil(q * len(samples)) - 1, 0)] for q in quantiles]
+
+    # Function to copy (count, errors, total seconds, cumulative bucket counts) consistently
+    def totals(self):
+        with self._lock:
+            cumulative = list(self.bucket_counts)
+            count, errors, total_seconds = self.count, self.errors, self.total_seconds
+        for i in range(1, len(cumulative)):
+            cumulative[i] += cumulative[i - 1]
+        return count, errors, total_seconds, cumulative
+
+
+# The histograms of one process, by operation name, plus the counters of other
+# components (e.g. cache hits and misses) exported next to them
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._counter_sources = {}
+        self._lock = threading.Lock()
+
+    # Function to export a component's counters: stats() returns {name: number or None},
+    # rendered as gauges named <prefix>_<name>
+    def register_counters(self, prefix, stats):
+        with self._lock:
+            self._counter_sources[prefix] = stats
+
+    def counter_sources(self):
+        with self._lock:
+            return sorted(self._counter_sources.items())
+
+    # Function to get an operation's histogram, creating it on first use
+    def histogram(self, operation):
+        histogram = self._histograms.get(operation)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(operation, LatencyHistogram())
+        return histogram
+
+    def items(self):
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    # Function to summarise every operation as a row of counts and latencies in milliseconds
+    def summary(self):
+        rows = []
+        for operation, histogram in self.items():
+            count, errors, total_seconds, _ = histogram.totals()
+            p50, p95, p99 = (None if seconds is None else seconds * 1000 for seconds in histogram.percentiles())
+            rows.append({"operation": operation, "count": count, "errors": errors,
+                         "mean_ms": total_seconds * 1000 / count if count else None,
+                         "p50_ms": p50, "p95_ms": p95, "p99_ms": p99})
+        return rows
+
+
+REGISTRY = MetricsRegistry()
+
+
+# Context manager (or decorator) timing one call of `operation`; exceptions count as errors
+@contextlib.contextmanager
+def timed(operation, registry=REGISTRY):
+    histogram = registry.histogram(operation)
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started, error)
+
+
+def _label(operation, **labels):
+    escaped = operation.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    extra = "".join(f',{name}="{value}"' for name, value in labels.items())
+    return f'{{operation="{escaped}"{extra}}}'
+
+
+# Function to render every histogram in the Prometheus text exposition format
+def prometheus_text(registry=REGISTRY):
+    seconds, recent, errors = (f"{METRIC_PREFIX}_seconds", f"{METRIC_PREFIX}_recent_seconds",
+                               f"{METRIC_PREFIX}_errors_total")
+    lines = [f"# HELP {seconds} Latency of instrumented operations.", f"# TYPE {seconds} histogram"]
+    summaries = []
+    for operation, histogram in registry.items():
+        count, error_count, total_seconds, cumulative = histogram.totals()
+        for bound, bucket_count in zip(BUCKETS, cumulative):
+            lines.append(f"{seconds}_bucket{_label(operation, le=repr(bound))} {bucket_count}")
+        lines.append(f"{seconds}_bucket{_label(operation, le='+Inf')} {count}")
+        lines.append(f"{seconds}_sum{_label(operation)} {total_seconds!r}")
+        lines.append(f"{seconds}_count{_label(operation)} {count}")
+        summaries.append((operation, error_count, histogram.percentiles()))
+
+    lines += [f"# HELP {recent} Percentiles of the most recent calls of each operation.", f"# TYPE {recent} gauge"]
+    for operation, _, percentiles in summaries:
+        for quantile, value in zip(QUANTILES, percentiles):
+            if value is not None:
+                lines.append(f"{recent}{_label(operation, quantile=quantile)} {value!r}")
+    lines += [f"# HELP {errors} Instrumented calls that raised.", f"# TYPE {errors} counter"]
+    for operation, error_count, _ in summaries:
+        lines.append(f"{errors}{_label(operation)} {error_count}")
+    for prefix, stats in registry.counter_sources():
+        for name, value in stats().items():
+            if value is not None:
+                lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value!r}"]
+    return "\n".join(lines) + "\n"
+
+
+# Function to write the Prometheus text to `path` (swapped in whole, so readers never
+# see a partial file)
+def write_metrics_file(path, registry=REGISTRY):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(prometheus_text(registry))
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def _write_file_periodically(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_file(path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+
+
+# Function to start the configured exporters (METRICS_PORT, METRICS_FILE) once per process.
+# Streamlit re-executes the app script on every rerun, so repeated calls are no-ops.
+def start_exporter(port=METRICS_PORT, path=METRICS_FILE):
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    if port:
+        try:
+            server = http.server.ThreadingHTTPServer((METRICS_HOST, int(port)), _MetricsHandler)
+        except OSError as error:
+            # e.g. the port is taken by another app process; keep running without it
+            logger.warning("Could not serve metrics on %s:%s: %s", METRICS_HOST, port, error)
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if path:
+        threading.Thread(target=_write_file_periodically, args=(path, METRICS_FILE_INTERVAL),
+                         name="metrics-file", daemon=True).start()
+        atexit.register(write_metrics_file, path)
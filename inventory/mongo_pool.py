@@ -0,0 +1,104 @@
+import atexit
+import logging
+import os
+import threading
+
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Connection settings, overridable through the environment. Credentials only ever come
+# from MONGO_URI; without it a local server is used.
+# Use MONGO_URI=mongomock:// to run against an in-process mongomock stand-in.
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+DATABASE_NAME = os.environ.get("MONGO_DATABASE", "product_management_system")
+MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+
+# Indexes created once per client, as {collection: [(keys, options), ...]}.
+# The unique username index lets registration be a single insert.
+INDEXES = {
+    "users": [("username", {"unique": True, "name": "username_unique"})],
+    "products": [("name", {"unique": True, "name": "name_unique"})],
+    "pricing": [("group", {"unique": True, "name": "group_unique"})],
+}
+
+logger = logging.getLogger(__name__)
+
+# One client per process. Streamlit re-executes the app script on every rerun,
+# but imported modules are cached, so every session shares this client and its
+# connection pool instead of repeating TLS/SRV discovery.
+_client = None
+_lock = threading.Lock()
+
+
+# Function to build a client with the configured pool size and timeouts
+def _create_client():
+    if MONGO_URI.startswith("mongomock://"):
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(
+        MONGO_URI,
+        maxPoolSize=MAX_POOL_SIZE,
+        minPoolSize=MIN_POOL_SIZE,
+        connectTimeoutMS=CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=SOCKET_TIMEOUT_MS,
+    )
+
+
+# Function to create the INDEXES on a freshly built client (create_index is idempotent)
+def _ensure_indexes(client):
+    database = client[DATABASE_NAME]
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                database[collection].create_index(keys, **options)
+            except OperationFailure as error:
+                # e.g. duplicate usernames already stored; keep serving, but make it visible
+                logger.warning("Could not create index %s on %s: %s", options.get("name", keys), collection, error)
+
+
+# Function to get the shared client, creating it (and its indexes) on first use
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                client = _create_client()
+                _ensure_indexes(client)
+                _client = client
+    return _client
+
+
+# Function to get the application database from the shared client
+def get_database():
+    return get_client()[DATABASE_NAME]
+
+
+# Function to get a collection handle from the shared client
+def get_collection(name):
+    return get_database()[name]
+
+
+# Function to check that the server is reachable; returns True when healthy
+def ping():
+    try:
+        get_client().admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+# Function to close the shared client; the next get_client() opens a new one
+def close_client():
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+atexit.register(close_client)
@@ -0,0 +1,76 @@
+# Catalog, purchase and cart operations shared by every front end.
+# They validate their input and raise ValueError with a message meant for the user,
+# so a front end only parses its widgets and shows the outcome. A "buyer" is anything
+# with purchase(name, quantity) and purchase_many(items): a ProductStore, or a
+# PurchaseEngine when purchases are decided by MongoDB.
+
+
+# Function to add (or overwrite) a product from form values
+def add_product(store, name, price, quantity):
+    name = (name or "").strip()
+    if not name or not price > 0 or not quantity > 0:
+        raise ValueError("Please fill all fields with valid data.")
+    store.add(name, price, quantity)
+    return name
+
+
+# Function to apply a percentage discount to every product, or to one product group
+def apply_discount(store, discount_percentage, group=None):
+    if not 0 <= discount_percentage <= 100:
+        raise ValueError("Please enter a valid discount percentage (0-100).")
+    store.apply_discount(discount_percentage, group or None)
+
+
+# Function to end the discount of every product, or of one product group
+def revert_discount(store, group=None):
+    store.revert_discount(group or None)
+
+
+# Function to put products in a group from form values (an empty group takes them out)
+def set_product_group(store, names, group):
+    names = list(names)
+    if not names:
+        raise ValueError("Please select a product.")
+    unknown = [name for name in names if name not in store]
+    if unknown:
+        raise ValueError(f"Unknown products: {', '.join(unknown)}.")
+    store.set_group(names, (group or "").strip() or None)
+
+
+def _check_selection(name, quantity):
+    if not name:
+        raise ValueError("Please select a product.")
+    if quantity <= 0:
+        raise ValueError("Please enter a valid quantity.")
+
+
+# Function to buy units of one product; returns False when there is not enough stock
+def purchase(buyer, name, quantity=1):
+    _check_selection(name, quantity)
+    return buyer.purchase(name, quantity)
+
+
+# Function to add units of a product to a cart ({name: units})
+def add_to_cart(cart, name, quantity=1):
+    _check_selection(name, quantity)
+    cart[name] = cart.get(name, 0) + quantity
+
+
+# Function to price a cart: returns ([(name, units, price, line total)], cart total)
+def cart_lines(store, cart):
+    lines = []
+    for name, quantity in cart.items():
+        price = store.price(name) if name in store else 0.0
+        lines.append((name, quantity, price, round(price * quantity, 2)))
+    return lines, sum(line[3] for line in lines)
+
+
+# Function to buy a whole cart all or nothing. Returns the names that could not be
+# bought; on success (an empty list) the cart is emptied.
+def checkout(buyer, cart):
+    if not cart:
+        raise ValueError("Your cart is empty.")
+    failed = buyer.purchase_many(cart)
+    if not failed:
+        cart.clear()
+    return failed
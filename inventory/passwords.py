@@ -0,0 +1,9 @@
+import hashlib
+
+# Function to hash passwords
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Function to hash a batch of passwords in one call (one task per batch in worker pools)
+def hash_passwords(passwords):
+    return [hash_password(password) for password in passwords]
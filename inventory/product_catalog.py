@@ -0,0 +1,246 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from pymongo import DeleteMany, DeleteOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .mongo_pool import get_collection
+from .product_store import ProductStore
+from .purchase_engine import PurchaseEngine
+from .sales_events import sales_history
+
+# Flush the write-behind queue once it holds this many operations...
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", "500"))
+# ...or once its oldest operation has waited this many seconds
+WRITE_BEHIND_MAX_DELAY = float(os.environ.get("WRITE_BEHIND_MAX_DELAY", "1.0"))
+# "memory": purchases are decided by the process-local store and written behind.
+# "mongo": purchases are decided by an atomic conditional update in MongoDB; use this
+# when several server processes share the catalog.
+PURCHASE_MODE = os.environ.get("PURCHASE_MODE", "memory")
+
+logger = logging.getLogger(__name__)
+
+
+# Function to translate a ProductStore mutation event into write operations on the
+# products collection. Products keep their base prices there; discounts are kept in
+# the pricing collection (see pricing_operations_for_event).
+def operations_for_event(event, *args):
+    if event == "add":
+        name, price, quantity = args
+        return [UpdateOne({"name": name}, {"$set": {"price": price, "quantity": quantity}}, upsert=True)]
+    if event == "extend":
+        names, prices, quantities = args
+        return [UpdateOne({"name": name}, {"$set": {"price": price, "quantity": quantity}}, upsert=True)
+                for name, price, quantity in zip(names, prices.tolist(), quantities.tolist())]
+    if event == "remove":
+        name, _ = args
+        return [DeleteOne({"name": name})]
+    if event == "clear":
+        return [DeleteMany({})]
+    if event == "purchase":
+        name, quantity = args
+        return [UpdateOne({"name": name}, {"$inc": {"quantity": -quantity}})]
+    if event == "discount":
+        return []
+    if event == "group":
+        names, group = args
+        update = {"$unset": {"group": ""}} if group is None else {"$set": {"group": group}}
+        return [UpdateMany({"name": {"$in": names}}, update)]
+    if event == "sync":
+        # The value came from MongoDB, so there is nothing to write back
+        return []
+    raise ValueError(f"Unknown product event: {event!r}")
+
+
+# Function to translate a ProductStore mutation event into write operations on the
+# pricing collection: one {"group", "multiplier"} document per discount (group None:
+# the whole catalog), so a sale is one small write however many products it covers
+def pricing_operations_for_event(event, *args):
+    if event == "discount":
+        multiplier, group = args
+        return [UpdateOne({"group": group}, {"$set": {"multiplier": multiplier}}, upsert=True)]
+    if event == "clear":
+        return [DeleteMany({})]
+    return []
+
+
+# Queue of pending product writes, flushed to MongoDB as ordered bulk_write batches
+# by a background thread, so the UI never waits for a round trip per change.
+# With write_through, every event is written before the listener returns instead.
+class WriteBehindQueue:
+    def __init__(self, collection, max_batch=WRITE_BEHIND_MAX_BATCH, max_delay=WRITE_BEHIND_MAX_DELAY,
+                 translate=operations_for_event, write_through=False):
+        self.collection = collection
+        self.translate = translate
+        self.write_through = write_through
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="product-write-behind", daemon=True)
+        self._thread.start()
+
+    # ProductStore listener: queue the event's write operations
+    def __call__(self, event, *args):
+        self.enqueue(self.translate(event, *args))
+        if self.write_through:
+            self.flush()
+
+    def enqueue(self, operations):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(operations)
+            if len(self._pending) >= self.max_batch:
+                self._wakeup.set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    # Function to write everything queued so far; failed batches are put back for a retry
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                operations, self._pending, self._oldest = self._pending, [], None
+            written = 0
+            try:
+                while written < len(operations):
+                    batch = operations[written:written + self.max_batch]
+                    try:
+                        self.collection.bulk_write(batch, ordered=True)
+                    except BulkWriteError as error:
+                        write_errors = error.details.get("writeErrors") or []
+                        if not write_errors:
+                            # Only the write concern failed: the batch was applied, so carry on
+                            # with the rest on the next flush
+                            logger.warning("Product writes not acknowledged by the write concern: %s",
+                                           error.details.get("writeConcernErrors"))
+                            written += len(batch)
+                            return False
+                        # An ordered batch stops at the first bad write: everything before it was
+                        # applied, the bad write is dropped, and the rest is retried
+                        failed = write_errors[0]["index"]
+                        logger.warning("Dropping product write %r: %s", batch[failed], write_errors[0].get("errmsg"))
+                        written += failed + 1
+                        return False
+                    except PyMongoError as error:
+                        logger.warning("Product write-behind flush failed, will retry: %s", error)
+                        return False
+                    written += len(batch)
+            finally:
+                # Whatever was not written, whatever went wrong, goes back in the queue
+                self._requeue(operations[written:])
+        return True
+
+    # Function to put unwritten operations back in front of anything queued since
+    def _requeue(self, operations):
+        if not operations:
+            return
+        with self._lock:
+            self._pending[:0] = operations
+            self._oldest = time.monotonic()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.max_delay / 4)
+            self._wakeup.clear()
+            with self._lock:
+                due = self._pending and (len(self._pending) >= self.max_batch
+                                         or time.monotonic() - self._oldest >= self.max_delay)
+            if due:
+                try:
+                    self.flush()
+                except Exception:
+                    # Keep the writer alive; the error is logged for investigation
+                    logger.exception("Unexpected error in product write-behind flush")
+
+    # Function to stop the background thread after a final flush
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+
+# Process-wide catalog shared by every session: MongoDB's products collection is the
+# source of truth and this ProductStore is the process-local read cache.
+_catalog = None
+_writer = None
+_pricing_writer = None
+_engine = None
+_catalog_lock = threading.Lock()
+
+
+# Function to load the products and pricing collections into a fresh ProductStore
+def _load_catalog(collection, pricing_collection):
+    names, prices, quantities, groups = [], [], [], {}
+    for product in collection.find({}, {"_id": 0, "name": 1, "price": 1, "quantity": 1, "group": 1}):
+        names.append(product["name"])
+        prices.append(product.get("price", 0.0))
+        quantities.append(product.get("quantity", 0))
+        if product.get("group") is not None:
+            groups.setdefault(product["group"], []).append(product["name"])
+    store = ProductStore.from_columns(names, prices, quantities)
+    for group, members in groups.items():
+        store.set_group(members, group)
+    for discount in pricing_collection.find({}, {"_id": 0, "group": 1, "multiplier": 1}):
+        store.set_discount(discount["multiplier"], discount.get("group"))
+    return store
+
+
+# Function to get the shared catalog, loading it from MongoDB on first use
+def get_shared_catalog():
+    global _catalog, _writer, _pricing_writer
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                collection = get_collection("products")
+                pricing_collection = get_collection("pricing")
+                catalog = _load_catalog(collection, pricing_collection)
+                # In mongo mode purchases $inc the products collection directly, so a
+                # quantity $set from an add must not be written after purchases made since
+                _writer = WriteBehindQueue(collection, write_through=PURCHASE_MODE == "mongo")
+                _pricing_writer = WriteBehindQueue(pricing_collection, translate=pricing_operations_for_event)
+                catalog.subscribe(_writer)
+                catalog.subscribe(_pricing_writer)
+                # Record purchases from the start, for the sales velocity reports
+                sales_history(catalog)
+                _catalog = catalog
+    return _catalog
+
+
+# Function to get the shared purchase engine configured by PURCHASE_MODE
+def get_purchase_engine():
+    global _engine
+    if _engine is None:
+        catalog = get_shared_catalog()
+        with _catalog_lock:
+            if _engine is None:
+                collection = get_collection("products") if PURCHASE_MODE == "mongo" else None
+                _engine = PurchaseEngine(catalog, collection)
+    return _engine
+
+
+# Function to write any queued product changes now (e.g. before a reload or shutdown)
+def flush_catalog():
+    if _writer is not None:
+        flushed = _writer.flush()
+        return _pricing_writer.flush() and flushed
+    return True
+
+
+# Function to stop the write-behind threads after writing what is still queued
+def close_catalog():
+    if _writer is not None:
+        _writer.close()
+        _pricing_writer.close()
+
+
+atexit.register(close_catalog)
@@ -0,0 +1,110 @@
+import gzip
+import io
+import os
+
+import numpy as np
+
+from .product_store import ProductStore
+
+# pandas is imported inside the functions below rather than here: it takes longer to
+# import than the rest of the app put together, and only CSV loading/saving needs it.
+
+# Rows parsed, validated and added to the store per chunk
+CHUNK_ROWS = 100_000
+GZIP_MAGIC = b"\x1f\x8b"
+# Columns a products CSV needs besides the name index
+REQUIRED_COLUMNS = ("price", "quantity")
+# Quantities must be below this (2**63) to fit in an int64 column
+QUANTITY_LIMIT = 2.0 ** 63
+
+
+# Result of a streaming load: the new store plus how many rows were kept/rejected
+class CsvLoadResult:
+    def __init__(self, store):
+        self.store = store
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+
+
+# Function to check that a products CSV header has the columns validate_chunk reads
+def check_columns(columns):
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Products CSV is missing the column(s): {', '.join(missing)}.")
+
+
+# Function to keep only valid rows of a chunk, returning (names, prices, quantities, rejected)
+def validate_chunk(chunk):
+    import pandas as pd
+
+    names = chunk.index.to_series(index=None)
+    prices = pd.to_numeric(chunk["price"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    quantities = pd.to_numeric(chunk["quantity"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    # Quantities were historically written as floats ("10.0"); accept them when whole
+    valid = (names.notna().to_numpy() & np.isfinite(prices) & (prices >= 0)
+             & np.isfinite(quantities) & (quantities >= 0) & (quantities < QUANTITY_LIMIT)
+             & (quantities == np.floor(quantities)))
+    kept_names = names[valid].astype(str).tolist()
+    return kept_names, prices[valid], quantities[valid].astype(np.int64), int((~valid).sum())
+
+
+# Function to stream a products CSV (optionally gzip-compressed) into a new ProductStore.
+# The file is parsed in fixed-size chunks, so memory stays bounded by the chunk size
+# plus the store itself. `progress(fraction, rows_loaded)` is called after each chunk.
+def load_csv(path="products.csv", chunk_rows=CHUNK_ROWS, progress=None):
+    import pandas as pd
+
+    result = CsvLoadResult(ProductStore())
+    total_bytes = os.path.getsize(path) or 1
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == GZIP_MAGIC
+        raw.seek(0)
+        source = gzip.GzipFile(fileobj=raw) if compressed else raw
+        reader = pd.read_csv(source, index_col=0, chunksize=chunk_rows)
+        for index, chunk in enumerate(reader):
+            if index == 0:
+                check_columns(chunk.columns)
+            names, prices, quantities, rejected = validate_chunk(chunk)
+            result.store.extend(names, prices, quantities)
+            result.rows_loaded += len(names)
+            result.rows_rejected += rejected
+            if progress is not None:
+                progress(min(raw.tell() / total_bytes, 1.0), result.rows_loaded)
+    return result
+
+
+# Function to write a ProductStore as CSV text (name index, price, quantity columns) to an
+# open text file, in chunks. `progress(fraction, rows_saved)` is called after each chunk.
+def write_csv(store, csv_file, chunk_rows=CHUNK_ROWS, progress=None):
+    import pandas as pd
+
+    names, prices, quantities = store.copy_columns()
+    # An empty store still gets one (empty) chunk, so the header is written
+    for start in range(0, max(len(names), 1), chunk_rows):
+        end = min(start + chunk_rows, len(names))
+        chunk = pd.DataFrame({"price": prices[start:end], "quantity": quantities[start:end]}, index=names[start:end])
+        chunk.to_csv(csv_file, header=start == 0)
+        if progress is not None:
+            progress(end / max(len(names), 1), end)
+
+
+# Function to get a ProductStore as the bytes of a products CSV (e.g. for a download)
+def csv_bytes(store):
+    text = io.StringIO(newline="")
+    write_csv(store, text)
+    return text.getvalue().encode("utf-8")
+
+
+# Function to save a ProductStore as a products CSV file. It is written to a temporary
+# file that replaces `path` at the end, so a save interrupted part way (e.g. by `progress`
+# raising to cancel it) leaves the old file intact.
+def save_csv(store, path="products.csv", chunk_rows=CHUNK_ROWS, progress=None):
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as csv_file:
+            write_csv(store, csv_file, chunk_rows, progress)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
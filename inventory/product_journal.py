@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from .product_snapshot import SNAPSHOT_PATH, copy_snapshot, fsync_dir, fsync_file, load_snapshot, read_snapshot_meta, write_snapshot
+from .product_store import ProductStore
+
+JOURNAL_PATH = "products.journal"
+# A compaction moves the journal to JOURNAL_PATH + OLD_SUFFIX and starts a new one; the
+# old segment is deleted once the snapshot holding its records is on disk
+OLD_SUFFIX = ".old"
+# fsync after this many records...
+FSYNC_EVERY = int(os.environ.get("JOURNAL_FSYNC_EVERY", "64"))
+# ...or this many seconds after the first unsynced record
+FSYNC_INTERVAL = float(os.environ.get("JOURNAL_FSYNC_INTERVAL", "1.0"))
+# Fold the journal into a fresh snapshot after this many records
+COMPACT_EVERY = int(os.environ.get("JOURNAL_COMPACT_EVERY", "100000"))
+
+logger = logging.getLogger(__name__)
+
+
+# Function to turn a ProductStore event into a JSON-serialisable journal record
+def _record(seq, event, args):
+    if event == "add":
+        name, price, quantity = args
+        return {"seq": seq, "op": "add", "name": name, "price": price, "quantity": quantity}
+    if event == "extend":
+        names, prices, quantities = args
+        return {"seq": seq, "op": "extend", "names": list(names), "prices": prices.tolist(), "quantities": quantities.tolist()}
+    if event == "remove":
+        return {"seq": seq, "op": "remove", "name": args[0]}
+    if event == "clear":
+        return {"seq": seq, "op": "clear"}
+    if event == "purchase":
+        name, quantity = args
+        return {"seq": seq, "op": "purchase", "name": name, "quantity": int(quantity)}
+    if event == "discount":
+        multiplier, group = args
+        return {"seq": seq, "op": "discount", "multiplier": multiplier, "group": group}
+    if event == "group":
+        names, group = args
+        return {"seq": seq, "op": "group", "names": names, "group": group}
+    if event == "sync":
+        name, price, quantity = args
+        return {"seq": seq, "op": "sync", "name": name, "price": float(price), "quantity": int(quantity)}
+    raise ValueError(f"Unknown product event: {event!r}")
+
+
+# Function to re-apply one journal record to a store
+def _apply(store, record):
+    op = record["op"]
+    if op == "add":
+        store.add(record["name"], record["price"], record["quantity"])
+    elif op == "extend":
+        store.extend(record["names"], record["prices"], record["quantities"])
+    elif op == "remove":
+        store.remove(record["name"])
+    elif op == "clear":
+        store.clear()
+    elif op == "purchase":
+        store.purchase(record["name"], record["quantity"])
+    elif op == "discount":
+        if "multiplier" in record:
+            store.set_discount(record["multiplier"], record["group"])
+        else:
+            # Journals written before discounts were multipliers record a percentage
+            store.apply_discount(record["percentage"])
+    elif op == "group":
+        store.set_group(record["names"], record["group"])
+    elif op == "sync":
+        store.sync(record["name"], record["price"], record["quantity"])
+    else:
+        raise ValueError(f"Unknown journal operation: {op!r}")
+
+
+# Function to replay journal records newer than `after_seq` onto a store, starting with
+# the old segment a compaction left behind if it did not finish. Returns the last
+# sequence number seen.
+def replay(store, path=JOURNAL_PATH, after_seq=0):
+    return _replay_segment(store, path, _replay_segment(store, path + OLD_SUFFIX, after_seq))
+
+
+# Function to replay one journal file. Records already applied (seq <= the last one
+# seen) are skipped. A torn final line (crash mid-write) is cut off, so the next record
+# starts on a clean line.
+def _replay_segment(store, path, after_seq):
+    last_seq = after_seq
+    if not os.path.exists(path):
+        return last_seq
+    with open(path, "rb+") as journal_file:
+        valid_bytes = 0
+        for line in journal_file:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("unterminated record")
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Discarding torn journal record in %s", path)
+                journal_file.truncate(valid_bytes)
+                break
+            valid_bytes += len(line)
+            if record["seq"] > last_seq:
+                _apply(store, record)
+                last_seq = record["seq"]
+    return last_seq
+
+
+# Append-only journal of catalog mutations.
+# Subscribed to a ProductStore, it appends one JSON line per mutation and fsyncs in
+# batches (every FSYNC_EVERY records or FSYNC_INTERVAL seconds). Once COMPACT_EVERY
+# records have accumulated, the store is written to a snapshot stamped with the last
+# journal sequence number and the journal segment it replaces is deleted.
+class ProductJournal:
+    def __init__(self, store, path=JOURNAL_PATH, snapshot_path=SNAPSHOT_PATH, next_seq=1,
+                 fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.old_path = path + OLD_SUFFIX
+        self.snapshot_path = snapshot_path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self._seq = next_seq
+        self._unsynced = 0
+        self._first_unsynced = None
+        self._since_compaction = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.store = None
+        self.attach(store, compact=False)
+        self._thread = threading.Thread(target=self._run, name="product-journal", daemon=True)
+        self._thread.start()
+
+    # ProductStore listener: append the event as the next journal record
+    def __call__(self, event, *args):
+        with self._lock:
+            self._file.write(json.dumps(_record(self._seq, event, args)) + "\n")
+            self._seq += 1
+            self._since_compaction += 1
+            self._unsynced += 1
+            if self._first_unsynced is None:
+                self._first_unsynced = time.monotonic()
+            if self._unsynced >= self.fsync_every:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._first_unsynced = None
+
+    # Function to force every written record to disk
+    def sync(self):
+        with self._lock:
+            if self._unsynced:
+                self._sync_locked()
+
+    # Function to fold the journal into a snapshot and start an empty journal
+    def compact(self):
+        with self._compact_lock:
+            # Pausing the store first means no record can arrive between the copy and the
+            # rotation; the journal lock is only taken afterwards (writers hold the
+            # store's locks while they call into the journal). Only the copy happens
+            # under the locks: the snapshot is written while the store stays usable.
+            with self.store.locked():
+                with self._lock:
+                    columns = copy_snapshot(self.store)
+                    seq = self._seq - 1
+                    self._rotate_locked()
+                    self._since_compaction = 0
+            write_snapshot(columns, self.snapshot_path, journal_seq=seq)
+            os.remove(self.old_path)
+
+    # Function to move the journal's records to the old segment and start a new file
+    def _rotate_locked(self):
+        self._sync_locked()
+        self._file.close()
+        if os.path.exists(self.old_path):
+            # An earlier compaction did not finish: its records stay with these ones
+            with open(self.path, "rb") as current_file, open(self.old_path, "ab") as old_file:
+                shutil.copyfileobj(current_file, old_file)
+                fsync_file(old_file)
+            self._file = open(self.path, "w", encoding="utf-8")
+        else:
+            os.replace(self.path, self.old_path)
+            self._file = open(self.path, "a", encoding="utf-8")
+        fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+    # Function to journal a different store (e.g. after loading a file); compacts right
+    # away so the new contents are captured by a snapshot instead of one huge record
+    def attach(self, store, compact=True):
+        if self.store is not None:
+            self.store.unsubscribe(self)
+        self.store = store
+        store.subscribe(self)
+        if compact:
+            self.compact()
+
+    def _run(self):
+        while not self._stopped.wait(self.fsync_interval / 4):
+            with self._lock:
+                if self._first_unsynced is not None and time.monotonic() - self._first_unsynced >= self.fsync_interval:
+                    self._sync_locked()
+                due = self._since_compaction >= self.compact_every
+            if due:
+                try:
+                    self.compact()
+                except Exception:
+                    # Keep journaling; the next interval tries again
+                    logger.exception("Journal compaction failed")
+
+    # Function to stop the background thread and close the journal file
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+        self.store.unsubscribe(self)
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+
+
+# Function to open the durable catalog: load the last snapshot, replay the journal tail
+# on top of it and keep journaling. Returns (store, journal).
+def open_journaled_store(snapshot_path=SNAPSHOT_PATH, journal_path=JOURNAL_PATH, **journal_options):
+    if os.path.exists(snapshot_path):
+        store = load_snapshot(snapshot_path)
+        snapshot_seq = read_snapshot_meta(snapshot_path).get("journal_seq") or 0
+    else:
+        store = ProductStore()
+        snapshot_seq = 0
+    last_seq = replay(store, journal_path, snapshot_seq)
+    journal = ProductJournal(store, journal_path, snapshot_path, next_seq=last_seq + 1, **journal_options)
+    return store, journal
@@ -0,0 +1,147 @@
+import contextlib
+import threading
+import weakref
+
+import numpy as np
+
+# Columns a report can be run on ("value" is price * quantity)
+METRICS = ("price", "quantity", "value")
+# Changed products above which a sorted index is rebuilt from scratch instead of merged
+MERGE_LIMIT = 10_000
+
+
+# Sorted indexes for inventory reports.
+# For each metric the index keeps the store's rows sorted by that metric, next to the
+# sorted keys, so a threshold/range query is two binary searches plus a slice and a
+# top-N query is a slice from the end: O(log n + k). Subscribed to a ProductStore, it
+# tracks what changed: purchases, syncs, adds and regroupings only mark their products
+# (appended rows don't move existing ones), and the next query merges those rows back
+# in with one vectorized pass; a discount, a removal or a clear rebuilds the affected
+# indexes from scratch.
+class ProductReportIndex:
+    def __init__(self, store):
+        self._store = weakref.ref(store)
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._rows = {}
+        self._stale = set(METRICS)
+        self._changed = {metric: set() for metric in METRICS}
+
+    # ProductStore listener: remember which indexes the event invalidated
+    def __call__(self, event, *args):
+        with self._lock:
+            if event == "purchase":
+                self._mark((args[0],), ("quantity", "value"))
+            elif event in ("add", "sync"):
+                self._mark(args[:1], METRICS)
+            elif event == "extend":
+                self._mark(args[0], METRICS)
+            elif event == "group":
+                # Regrouped products may now get another group's discount
+                self._mark(args[0], ("price", "value"))
+            elif event == "discount":
+                self._stale.update(("price", "value"))
+            else:
+                # remove/clear move rows around
+                self._stale.update(METRICS)
+
+    def _mark(self, names, metrics):
+        for metric in metrics:
+            if metric in self._stale:
+                continue
+            if len(names) > MERGE_LIMIT:
+                self._stale.add(metric)
+            else:
+                self._changed[metric].update(names)
+
+    # Function to get a metric's values for some rows (all rows when `rows` is None)
+    @staticmethod
+    def _column(store, metric, rows=None):
+        prices, quantities = store.prices, store.quantities
+        if rows is not None:
+            prices, quantities = prices[rows], quantities[rows]
+        if metric == "price":
+            return prices
+        if metric == "quantity":
+            return quantities
+        return prices * quantities
+
+    # Function to bring one metric's index up to date (callers hold the store and index locks)
+    def _refresh(self, store, metric):
+        changed = self._changed[metric]
+        if metric in self._stale or len(changed) > MERGE_LIMIT:
+            column = self._column(store, metric)
+            rows = np.argsort(column, kind="stable")
+            self._rows[metric], self._keys[metric] = rows, column[rows]
+        elif changed:
+            # Drop the changed rows, then insert them again at their new keys
+            moved = np.fromiter((row for row in map(store.row, changed) if row is not None), dtype=np.int64)
+            rows, keys = self._rows[metric], self._keys[metric]
+            is_moved = np.zeros(len(store), dtype=bool)
+            is_moved[moved] = True
+            kept = ~is_moved[rows]
+            rows, keys = rows[kept], keys[kept]
+            moved_keys = self._column(store, metric, moved)
+            order = np.argsort(moved_keys, kind="stable")
+            moved, moved_keys = moved[order], moved_keys[order]
+            positions = np.searchsorted(keys, moved_keys, side="right")
+            self._rows[metric] = np.insert(rows, positions, moved)
+            self._keys[metric] = np.insert(keys, positions, moved_keys)
+        self._stale.discard(metric)
+        changed.clear()
+
+    # Context manager yielding (store, sorted keys, sorted rows) for an up-to-date metric
+    @contextlib.contextmanager
+    def _sorted(self, metric):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown report metric: {metric!r}")
+        store = self._store()
+        # Same lock order as mutations: the store first, then the index
+        with store.locked(), self._lock:
+            self._refresh(store, metric)
+            yield store, self._keys[metric], self._rows[metric]
+
+    # Function to list products with low <= metric <= high (either bound may be None),
+    # in ascending metric order, at most `limit` of them
+    def between(self, metric, low=None, high=None, limit=None):
+        with self._sorted(metric) as (store, keys, rows):
+            start, stop = _span(keys, low, high)
+            if limit is not None:
+                stop = min(stop, start + limit)
+            return _products(store, rows[start:stop])
+
+    # Function to count products with low <= metric <= high without listing them
+    def count_between(self, metric, low=None, high=None):
+        with self._sorted(metric) as (store, keys, rows):
+            start, stop = _span(keys, low, high)
+            return stop - start
+
+    # Function to list products with metric < threshold (e.g. "under 5 units"), lowest first
+    def below(self, metric, threshold, limit=None):
+        with self._sorted(metric) as (store, keys, rows):
+            stop = int(np.searchsorted(keys, threshold, side="left"))
+            return _products(store, rows[:stop if limit is None else min(stop, limit)])
+
+    # Function to list the `n` products with the highest metric, highest first
+    def top(self, metric, n):
+        with self._sorted(metric) as (store, keys, rows):
+            return _products(store, rows[::-1][:n])
+
+
+# Function to find the sorted positions [start, stop) of keys with low <= key <= high
+def _span(keys, low, high):
+    start = 0 if low is None else int(np.searchsorted(keys, low, side="left"))
+    stop = len(keys) if high is None else int(np.searchsorted(keys, high, side="right"))
+    return start, max(start, stop)
+
+
+# Function to turn row numbers into (name, price, quantity) tuples
+def _products(store, rows):
+    names = store.names
+    return list(zip([names[row] for row in rows.tolist()], store.prices[rows].tolist(), store.quantities[rows].tolist()))
+
+
+# Function to get the report index of a ProductStore, created on first use and then kept
+# current by the store's events
+def report_index(store):
+    return store.attachment(ProductReportIndex, ProductReportIndex)
@@ -0,0 +1,274 @@
+import bisect
+import difflib
+import threading
+from itertools import accumulate
+
+import numpy as np
+
+# Default number of matches returned to a product picker
+SEARCH_LIMIT = 20
+# Names sharing the most trigrams with the query that are ranked for fuzzy matching
+FUZZY_CANDIDATES = 200
+# Names on each side of the query's sorted position that are also ranked (typos after a correct prefix)
+FUZZY_NEIGHBOURS = 50
+# Minimum difflib similarity ratio for a fuzzy match (difflib's own default)
+FUZZY_CUTOFF = 0.6
+# Names added or removed after the trigram index was built before it is rebuilt
+TRIGRAM_CHANGES = 4096
+# Separator between names in the substring-search text (never part of a query)
+SEPARATOR = "\x00"
+
+
+# Function to get the distinct byte trigrams of lowercase text as integer codes
+def _trigram_codes(text):
+    data = text.encode("utf-8")
+    return {data[start] << 16 | data[start + 1] << 8 | data[start + 2] for start in range(len(data) - 2)}
+
+
+# Function to score how well a query matches a lowercase name with difflib: against the
+# whole name, or if that falls short, against the stretch of the name lined up with the
+# longest run of characters they share, so a short query with a typo still matches a long name ("keybaord" in
+# "basic keyboard 12345"). `matcher` has the query as its second sequence, which difflib
+# indexes once for all names. Returns (score, whole-name ratio).
+def _similarity(matcher, needle, lower):
+    matcher.set_seq1(lower)
+    ratio = matcher.ratio()
+    if ratio >= FUZZY_CUTOFF or len(lower) <= len(needle):
+        return ratio, ratio
+    # A stretch can't match more characters than the whole name has in common with the query
+    if matcher.quick_ratio() * (len(needle) + len(lower)) / 2 < FUZZY_CUTOFF * len(needle):
+        return ratio, ratio
+    block = max(matcher.get_matching_blocks(), key=lambda block: block.size)
+    start = min(max(block.a - block.b, 0), len(lower) - len(needle))
+    matcher.set_seq1(lower[start:start + len(needle)])
+    return max(matcher.ratio(), ratio), ratio
+
+
+# Inverted index from byte trigrams to the names containing them, for fuzzy candidates.
+# Built in one pass of NumPy over all names: every (trigram, row) pair is packed into
+# one int64 and sorted, so each trigram's rows are one contiguous slice of `rows`,
+# found with a binary search of `codes`. Names added later are kept in a small dict and
+# removed ones are masked, until TRIGRAM_CHANGES such changes make a rebuild worthwhile.
+class _TrigramIndex:
+    def __init__(self, names, lowers):
+        self.names = names
+        self.lowers = lowers
+        data = np.frombuffer(SEPARATOR.join(lowers).encode("utf-8"), dtype=np.uint8)
+        # Row of each byte: the number of separators before it
+        byte_rows = np.cumsum(data == 0, dtype=np.int64)[:-2]
+        first, second, third = data[:-2], data[1:-1], data[2:]
+        valid = (first != 0) & (second != 0) & (third != 0)
+        codes = first.astype(np.int64) << 16 | second.astype(np.int64) << 8 | third
+        keys = codes[valid] << 32 | byte_rows[valid]
+        keys.sort()
+        # A trigram occurring twice in a name counts once
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+        self.codes = (keys >> 32).astype(np.uint32)
+        self.rows = (keys & 0xFFFFFFFF).astype(np.int32)
+        # Distinct trigrams per name, for the overlap score
+        self.sizes = np.bincount(self.rows, minlength=len(names))
+        self.removed = np.zeros(len(names), dtype=bool)
+        self.added = {}
+        self.changes = 0
+
+    def add(self, name, lower):
+        self.added[name] = _trigram_codes(lower)
+        self.changes += 1
+
+    def remove(self, name, lower):
+        self.changes += 1
+        if self.added.pop(name, None) is not None:
+            return
+        row = bisect.bisect_left(self.lowers, lower)
+        while row < len(self.lowers) and self.lowers[row] == lower:
+            if self.names[row] == name:
+                self.removed[row] = True
+                return
+            row += 1
+
+    # Function to check whether some name may contain all of a query's trigrams (names
+    # removed since the build may still count)
+    def may_contain(self, query_codes):
+        query = np.fromiter(query_codes, dtype=np.uint32, count=len(query_codes))
+        positions = np.minimum(np.searchsorted(self.codes, query), max(len(self.codes) - 1, 0))
+        missing = set(query[self.codes[positions] != query].tolist()) if len(self.codes) else set(query_codes)
+        return not missing or any(missing <= codes for codes in self.added.values())
+
+    # Function to get the `count` names most similar to a query's trigrams, by the share
+    # of trigrams they have in common (shared / all distinct trigrams of both)
+    def candidates(self, query_codes, count):
+        query = np.fromiter(query_codes, dtype=np.uint32, count=len(query_codes))
+        starts = np.searchsorted(self.codes, query, "left").tolist()
+        ends = np.searchsorted(self.codes, query, "right").tolist()
+        hits = [self.rows[start:end] for start, end in zip(starts, ends) if end > start]
+        scored = []
+        if hits:
+            shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+            rows = np.flatnonzero(shared)
+            rows = rows[~self.removed[rows]]
+            scores = shared[rows] / (len(query) + self.sizes[rows] - shared[rows])
+            if len(rows) > count:
+                best = np.argpartition(-scores, count)[:count]
+                rows, scores = rows[best], scores[best]
+            scored = list(zip(scores.tolist(), [self.names[row] for row in rows.tolist()]))
+        for name, codes in self.added.items():
+            shared = len(codes & query_codes)
+            if shared:
+                scored.append((shared / (len(query_codes) + len(codes) - shared), name))
+        scored.sort(reverse=True)
+        return [name for _, name in scored[:count]]
+
+
+# Search index over product names for search-as-you-type pickers.
+# Names are kept sorted case-insensitively next to their lowercase forms, so prefix
+# queries are a bisect. Substring queries scan one "\x00"-joined lowercase text of
+# all names with str.find, which runs in C and stops as soon as `limit` names are
+# found; a sorted offsets array maps each hit back to its name. When fewer than `limit` names match,
+# the names sharing the most trigrams with the query (see _TrigramIndex) are ranked by
+# similarity so typos still match.
+# Subscribed to a ProductStore, the index follows every add/extend/remove/clear; the
+# search text is rebuilt lazily on the first query after the names changed, the trigram
+# index on the first fuzzy query after it was dropped.
+class ProductSearchIndex:
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self._names = sorted(names, key=str.lower)
+        self._lowers = [name.lower() for name in self._names]
+        self._text = None
+        self._starts = None
+        self._trigrams = None
+
+    def __len__(self):
+        return len(self._names)
+
+    # ProductStore listener: keep the index in step with the catalog's names
+    def __call__(self, event, *args):
+        with self._lock:
+            if event in ("add", "sync"):
+                self._add_names(args[:1])
+            elif event == "extend":
+                self._add_names(args[0])
+            elif event == "remove":
+                self._remove_name(args[0])
+            elif event == "clear":
+                self._names.clear()
+                self._lowers.clear()
+                self._text = None
+                self._trigrams = None
+            if self._trigrams is not None and self._trigrams.changes > TRIGRAM_CHANGES:
+                self._trigrams = None
+
+    # Function to find where a name is (or would be inserted) and whether it is present
+    def _locate(self, name, lower):
+        position = bisect.bisect_left(self._lowers, lower)
+        end = bisect.bisect_right(self._lowers, lower, position)
+        for candidate in range(position, end):
+            if self._names[candidate] == name:
+                return candidate, True
+        return end, False
+
+    def _add_names(self, names):
+        if len(names) > 64:
+            # Bulk loads merge in one sort instead of many list inserts
+            merged = set(self._names)
+            merged.update(names)
+            self._names = sorted(merged, key=str.lower)
+            self._lowers = [name.lower() for name in self._names]
+            self._trigrams = None
+        else:
+            for name in names:
+                lower = name.lower()
+                position, present = self._locate(name, lower)
+                if not present:
+                    self._names.insert(position, name)
+                    self._lowers.insert(position, lower)
+                    if self._trigrams is not None:
+                        self._trigrams.add(name, lower)
+        self._text = None
+
+    def _remove_name(self, name):
+        lower = name.lower()
+        position, present = self._locate(name, lower)
+        if present:
+            del self._names[position]
+            del self._lowers[position]
+            self._text = None
+            if self._trigrams is not None:
+                self._trigrams.remove(name, lower)
+
+    # Function to (re)build the search text and the start offset of each name in it
+    def _ensure_text(self):
+        if self._text is None:
+            self._text = SEPARATOR.join(self._lowers)
+            self._starts = list(accumulate((len(lower) + 1 for lower in self._lowers[:-1]), initial=0))
+
+    # Function to yield the positions (in sorted order) of names containing `needle`
+    def _containing(self, needle):
+        text, starts = self._text, self._starts
+        position = text.find(needle)
+        while position != -1:
+            row = bisect.bisect_right(starts, position) - 1
+            yield row
+            if row + 1 == len(starts):
+                return
+            position = text.find(needle, starts[row + 1])
+
+    # Function to find up to `limit` product names matching a query (case-insensitive):
+    # prefix matches first, then other substring matches, then fuzzy matches
+    def search(self, query, limit=SEARCH_LIMIT):
+        needle = query.strip().lower().replace(SEPARATOR, "")
+        with self._lock:
+            if not needle:
+                return self._names[:limit]
+
+            start = bisect.bisect_left(self._lowers, needle)
+            end = start
+            while end < len(self._lowers) and end - start < limit and self._lowers[end].startswith(needle):
+                end += 1
+            matches = self._names[start:end]
+            if len(matches) == limit:
+                return matches
+
+            self._ensure_text()
+            found = set(matches)
+            codes = _trigram_codes(needle)
+            # A query with a trigram no name has is no name's substring: skip the scan
+            searchable = self._trigrams is None or self._trigrams.may_contain(codes)
+            for row in (self._containing(needle) if searchable else ()):
+                name = self._names[row]
+                if name not in found:
+                    matches.append(name)
+                    found.add(name)
+                    if len(matches) == limit:
+                        return matches
+            return matches + self._fuzzy(needle, codes, start, found, limit - len(matches))
+
+    # Function to rank the names sharing the most trigrams with the query, and the names
+    # near its sorted position, by difflib similarity
+    def _fuzzy(self, needle, codes, position, exclude, limit):
+        if not codes:
+            return []
+        if self._trigrams is None:
+            self._trigrams = _TrigramIndex(list(self._names), list(self._lowers))
+        candidates = set(self._trigrams.candidates(codes, FUZZY_CANDIDATES))
+        candidates.update(self._names[max(position - FUZZY_NEIGHBOURS, 0):position + FUZZY_NEIGHBOURS])
+        matcher = difflib.SequenceMatcher(None, b=needle)
+        scored = []
+        for name in candidates - exclude:
+            lower = name.lower()
+            score, ratio = _similarity(matcher, needle, lower)
+            if score >= FUZZY_CUTOFF:
+                scored.append((-score, -ratio, lower, name))
+        scored.sort()
+        return [name for *_, name in scored[:limit]]
+
+
+# Function to get the search index of a ProductStore, built on first use and then kept
+# current by the store's events
+def search_index(store):
+    return store.attachment(ProductSearchIndex, lambda store: ProductSearchIndex(store.names))
+
+
+# Function to find up to `limit` product names in a store matching a query
+def search_products(store, query, limit=SEARCH_LIMIT):
+    return search_index(store).search(query, limit)
@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from .product_store import ProductStore
+
+# Default snapshot location: a directory of NumPy .npy column files
+SNAPSHOT_PATH = "products.snapshot"
+# Version 2 added the product groups and discounts; version 1 snapshots still load
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+# Product names are stored as one UTF-8 blob separated by NUL characters
+NAME_SEPARATOR = "\x00"
+# A snapshot directory holds numbered versions (v000001, v000002, ...) and a pointer
+# file naming the current one. Snapshots written before versioning keep their column
+# files directly in the directory; they still load.
+POINTER_FILE = "CURRENT"
+VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+
+# Function to get the directory holding a snapshot's current column files
+def _current_dir(path):
+    try:
+        with open(os.path.join(path, POINTER_FILE)) as pointer_file:
+            return os.path.join(path, pointer_file.read().strip())
+    except FileNotFoundError:
+        return path
+
+
+# Function to create the next version directory of a snapshot; returns its name
+def _new_version(path):
+    numbers = [int(match.group(1)) for match in map(VERSION_PATTERN.match, os.listdir(path)) if match]
+    number = max(numbers, default=0) + 1
+    while True:
+        version = f"v{number:06d}"
+        try:
+            os.mkdir(os.path.join(path, version))
+            return version
+        except FileExistsError:
+            number += 1
+
+
+# Function to force an open file's contents to disk
+def fsync_file(open_file):
+    open_file.flush()
+    os.fsync(open_file.fileno())
+
+
+# Function to force a directory's entries (files created or renamed in it) to disk.
+# Windows can't open a directory for this; NTFS journals those changes itself.
+def fsync_dir(path):
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Function to write one column file and force it to disk
+def _save_column(file_path, array):
+    with open(file_path, "wb") as column_file:
+        np.save(column_file, array)
+        fsync_file(column_file)
+
+
+# Function to delete what older saves left in a snapshot directory, keeping the
+# current version and the one before it (a reader may still be opening it). Files
+# that can't be deleted yet, e.g. still memory-mapped on Windows, go on a later save.
+def _remove_old_versions(path, keep):
+    for entry in os.listdir(path):
+        if entry == POINTER_FILE or entry in keep:
+            continue
+        full_path = os.path.join(path, entry)
+        if os.path.isdir(full_path):
+            shutil.rmtree(full_path, ignore_errors=True)
+        else:
+            try:
+                os.remove(full_path)
+            except OSError:
+                pass
+
+
+# Function to write a binary columnar snapshot of a ProductStore.
+# Prices and quantities keep their dtypes (float64/int64) and can be memory-mapped on
+# load. Every save writes a new version directory and then switches the pointer file
+# to it, so files of an older version stay in place while a store still maps them.
+# `journal_seq` records the last journal entry already folded into the snapshot.
+# Base prices are saved with the product groups and discounts, so a sale can still be
+# reverted after a reload. With `materialize=True` the sale prices are saved as the
+# prices instead, without groups or discounts. The journal's snapshots must not be
+# materialized: its discount records set multipliers, not prices.
+def save_snapshot(store, path=SNAPSHOT_PATH, journal_seq=None, materialize=False):
+    write_snapshot(copy_snapshot(store, materialize), path, journal_seq)
+
+
+# Function to copy what a snapshot of a store holds, consistently, under the store's locks.
+# Returns (names, prices, quantities, multiplier, groups, codes) for write_snapshot.
+def copy_snapshot(store, materialize=False):
+    with store.locked():
+        names, prices, quantities = store.copy_columns(base_prices=not materialize)
+        multiplier, groups, codes = store.copy_pricing()
+    if materialize:
+        multiplier, groups, codes = 1.0, [], np.zeros(len(names), dtype=np.int32)
+    return names, prices, quantities, multiplier, groups, codes
+
+
+# Function to write columns copied by copy_snapshot as a new snapshot version. Every file
+# and directory entry is fsynced before returning, so the snapshot is durable once this
+# returns (the journal drops the records it holds after that).
+def write_snapshot(columns, path=SNAPSHOT_PATH, journal_seq=None):
+    names, prices, quantities, multiplier, groups, codes = columns
+    joined = NAME_SEPARATOR.join(names)
+    # Any NUL beyond the separators is inside a name (a single name has no separators)
+    if joined.count(NAME_SEPARATOR) != max(len(names) - 1, 0):
+        raise ValueError("Product names must not contain NUL characters.")
+
+    os.makedirs(path, exist_ok=True)
+    previous = os.path.basename(_current_dir(path))
+    version = _new_version(path)
+    version_path = os.path.join(path, version)
+    _save_column(os.path.join(version_path, "names.npy"), np.frombuffer(joined.encode("utf-8"), dtype=np.uint8))
+    _save_column(os.path.join(version_path, "price.npy"), prices)
+    _save_column(os.path.join(version_path, "quantity.npy"), quantities)
+    _save_column(os.path.join(version_path, "group.npy"), codes)
+    with open(os.path.join(version_path, "meta.json"), "w") as meta_file:
+        json.dump({"version": FORMAT_VERSION, "count": len(names), "journal_seq": journal_seq,
+                   "discount": multiplier, "groups": groups}, meta_file)
+        fsync_file(meta_file)
+    fsync_dir(version_path)
+
+    pointer_path = os.path.join(path, POINTER_FILE)
+    with open(pointer_path + ".tmp", "w") as pointer_file:
+        pointer_file.write(version)
+        fsync_file(pointer_file)
+    os.replace(pointer_path + ".tmp", pointer_path)
+    fsync_dir(path)
+    _remove_old_versions(path, keep={version, previous})
+
+
+# Function to read a snapshot's metadata (format version, row count, journal_seq)
+def read_snapshot_meta(path=SNAPSHOT_PATH):
+    return _read_meta(_current_dir(path))
+
+
+def _read_meta(directory):
+    with open(os.path.join(directory, "meta.json")) as meta_file:
+        return json.load(meta_file)
+
+
+# Function to open a snapshot as a ProductStore.
+# The price and quantity columns are memory-mapped copy-on-write, so opening a large
+# catalog does not read or copy them; only the names are decoded to build the index.
+def load_snapshot(path=SNAPSHOT_PATH):
+    # Resolved once, so a save switching the pointer meanwhile can't mix two versions
+    path = _current_dir(path)
+    meta = _read_meta(path)
+    if meta.get("version") not in READABLE_VERSIONS:
+        raise ValueError(f"Unsupported snapshot version: {meta.get('version')!r}")
+    if meta["count"] == 0:
+        store = ProductStore()
+        store.restore_pricing(meta.get("discount", 1.0), meta.get("groups", []), [])
+        return store
+
+    blob = np.load(os.path.join(path, "names.npy"), mmap_mode="r")
+    names = blob.tobytes().decode("utf-8").split(NAME_SEPARATOR)
+    prices = np.load(os.path.join(path, "price.npy"), mmap_mode="c")
+    quantities = np.load(os.path.join(path, "quantity.npy"), mmap_mode="c")
+    if not (len(names) == len(prices) == len(quantities) == meta["count"]):
+        raise ValueError(f"Snapshot '{path}' is incomplete or corrupted.")
+    store = ProductStore.from_arrays(names, prices, quantities)
+    if meta["version"] >= 2:
+        codes = np.load(os.path.join(path, "group.npy"))
+        if len(codes) != meta["count"]:
+            raise ValueError(f"Snapshot '{path}' is incomplete or corrupted.")
+        store.restore_pricing(meta["discount"], meta["groups"], codes)
+    return store
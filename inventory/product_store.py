@@ -0,0 +1,632 @@
+import contextlib
+import functools
+import itertools
+import math
+import os
+import threading
+
+import numpy as np
+
+# Starting number of rows allocated for the price/quantity columns
+INITIAL_CAPACITY = 1024
+
+# Set PRODUCT_STORE_CONSISTENCY_CHECK=1 to recompute the running aggregates
+# after every mutation and fail loudly if they drift from the columns
+CONSISTENCY_CHECK = os.environ.get("PRODUCT_STORE_CONSISTENCY_CHECK", "") not in ("", "0")
+
+# Number of lock stripes guarding per-product purchases
+LOCK_STRIPES = 64
+
+
+# Function to apply price multipliers to base prices: discounted prices are rounded to
+# cents, prices with a multiplier of 1 are left exactly as they are
+def discounted_prices(prices, multipliers):
+    return np.where(multipliers == 1.0, prices, np.round(prices * multipliers, 2))
+
+
+# Function to aggregate price/quantity columns: returns (total stock value, total units,
+# out-of-stock row numbers). It is the arithmetic behind the store's stock value and
+# out-of-stock reports, shared with the out-of-core file reports (inventory/file_reports.py).
+def column_aggregates(prices, quantities):
+    return float(np.dot(prices, quantities)), int(quantities.sum()), np.flatnonzero(quantities == 0)
+
+
+# Decorator for mutations that change the catalog's shape or every row (add, remove,
+# discount, ...). They take the store lock and every stripe, so they never overlap
+# a purchase and a catalog shared between sessions/threads sees them in order.
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock, self._all_stripes():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Columnar product catalog shared by all the front ends.
+# Products are kept as a name -> row index plus contiguous NumPy columns for
+# price and quantity, so reports run as vectorized array operations instead of
+# Python loops over a dict of dicts. Total stock value, total units and the
+# out-of-stock set are kept up to date by every mutation, so reports are O(1).
+# Discounts are not written into the price column: it keeps each product's base price,
+# and a discount only sets a multiplier, for the whole catalog or for one product group
+# (see set_group). Sale prices (base * multipliers, rounded to cents) are computed when
+# prices are read, so applying or reverting a sale is O(1) and repeated discounts don't
+# compound rounding errors. Each change of the multipliers starts a new discount epoch;
+# the sale price column and the total stock value are recomputed once per epoch, on
+# first use, and kept up to date row by row after that.
+# Listeners registered with subscribe() receive every mutation as an event:
+#   ("add", name, price, quantity), ("extend", names, prices, quantities),
+#   ("remove", name, row), ("clear",), ("purchase", name, quantity),
+#   ("discount", multiplier, group), ("group", names, group), ("sync", name, price, quantity)
+# Prices in events are base prices; a discount event carries the new multiplier of the
+# group (None: the whole catalog). A remove event carries the freed row, which the last
+# row has been moved into.
+class ProductStore:
+    def __init__(self, capacity=INITIAL_CAPACITY, consistency_check=None):
+        capacity = max(int(capacity), 1)
+        self._index = {}
+        self._names = []
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._quantity = np.zeros(capacity, dtype=np.int64)
+        # Product group codes (0: no group), with the group names and multipliers by code
+        self._group = np.zeros(capacity, dtype=np.int32)
+        self._group_names = [None]
+        self._group_codes = {None: 0}
+        self._group_multipliers = np.ones(1, dtype=np.float64)
+        self._multiplier = 1.0
+        self._discounted = False
+        self._discount_epoch = 0
+        # Sale prices of the live rows, valid while _sale_epoch == _discount_epoch
+        self._sale_price = None
+        self._sale_epoch = -1
+        self._value_stale = False
+        self._total_value = 0.0
+        self._total_units = 0
+        self._out_of_stock = set()
+        self._listeners = []
+        # Helpers kept in step with the store by its events, by key (see attachment)
+        self._attachments = {}
+        # Bumped by every mutation (itertools.count hands out each number once, even to
+        # purchases racing on different stripes)
+        self._versions = itertools.count(1)
+        self._version = 0
+        self._lock = threading.RLock()
+        # Purchases only lock the stripe owning their product, so buyers of different
+        # products run in parallel; the aggregate lock covers the shared running totals
+        self._stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._aggregate_lock = threading.Lock()
+        self.consistency_check = CONSISTENCY_CHECK if consistency_check is None else consistency_check
+
+    # Build a store from parallel name/price/quantity sequences
+    @classmethod
+    def from_columns(cls, names, prices, quantities):
+        store = cls(capacity=len(names))
+        store.extend(names, prices, quantities)
+        return store
+
+    # Build a store that adopts existing column arrays without copying them, e.g.
+    # memory-mapped snapshot columns; pages are only copied once rows are written
+    @classmethod
+    def from_arrays(cls, names, prices, quantities):
+        names = list(names)
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        if not (len(names) == len(prices) == len(quantities)):
+            raise ValueError("names, prices and quantities must have the same length")
+        index = dict(zip(names, range(len(names))))
+        if len(index) != len(names):
+            raise ValueError("product names must be unique")
+
+        store = cls(capacity=1)
+        if names:
+            store._index = index
+            store._names = names
+            store._price = prices
+            store._quantity = quantities
+            store._group = np.zeros(len(names), dtype=np.int32)
+            store._total_value, store._total_units, store._out_of_stock = store.recompute_aggregates()
+        return store
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    # Function to get a product's row number in the columns, or None if it is not in the store
+    def row(self, name):
+        return self._index.get(name)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    # Product names in row order
+    @property
+    def names(self):
+        return self._names
+
+    # Sale price column for the live rows (a view, not a copy). Without a discount these
+    # are the base prices; otherwise the sale prices are computed on the first read of a
+    # discount epoch.
+    @property
+    def prices(self):
+        if not self._discounted:
+            return self._price[:len(self._names)]
+        if self._sale_epoch != self._discount_epoch:
+            with self._lock, self._all_stripes():
+                if self._sale_epoch != self._discount_epoch:
+                    size = len(self._names)
+                    sale_price = np.zeros(len(self._price), dtype=np.float64)
+                    sale_price[:size] = discounted_prices(self._price[:size], self._multipliers(slice(0, size)))
+                    self._sale_price, self._sale_epoch = sale_price, self._discount_epoch
+        return self._sale_price[:len(self._names)]
+
+    # Base price column for the live rows, before any discount (a view, not a copy)
+    @property
+    def base_prices(self):
+        return self._price[:len(self._names)]
+
+    # Quantity column for the live rows (a view, not a copy)
+    @property
+    def quantities(self):
+        return self._quantity[:len(self._names)]
+
+    # Catalog version: it changes with every mutation, so anything derived from the store
+    # at one version stays valid while the version is unchanged (see inventory/view_cache.py)
+    @property
+    def version(self):
+        return self._version
+
+    # Number of discount changes so far; sale prices are valid within one epoch
+    @property
+    def discount_epoch(self):
+        return self._discount_epoch
+
+    # Function to get the price multipliers of some rows (catalog-wide times group multiplier)
+    def _multipliers(self, rows):
+        return self._multiplier * self._group_multipliers[self._group[rows]]
+
+    # Function to get the sale prices of some rows (a row number, slice or array of rows)
+    def _sale_prices(self, rows):
+        if not self._discounted:
+            return self._price[rows]
+        return discounted_prices(self._price[rows], self._multipliers(rows))
+
+    # Function to update the cached sale prices of rows whose base price or group changed
+    def _reprice(self, rows):
+        if self._discounted and self._sale_epoch == self._discount_epoch:
+            self._sale_price[rows] = self._sale_prices(rows)
+
+    # Function to register a callable receiving (event, *args) after each mutation
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    # Function to get the helper attached under `key` (a search or report index, the
+    # sales history, ...), creating it with factory(store) and subscribing it on first
+    # use. Mutations are paused meanwhile, so the helper misses no event.
+    def attachment(self, key, factory):
+        helper = self._attachments.get(key)
+        if helper is None:
+            with self.locked():
+                helper = self._attachments.get(key)
+                if helper is None:
+                    helper = factory(self)
+                    self.subscribe(helper)
+                    self._attachments[key] = helper
+        return helper
+
+    # Function to get the lock stripe guarding one product
+    def _stripe(self, name):
+        return self._stripes[hash(name) % LOCK_STRIPES]
+
+    # Context manager holding every stripe (always acquired in the same order)
+    @contextlib.contextmanager
+    def _all_stripes(self):
+        with contextlib.ExitStack() as stack:
+            for stripe in self._stripes:
+                stack.enter_context(stripe)
+            yield
+
+    # Context manager pausing every mutation (e.g. while the catalog is being compacted)
+    @contextlib.contextmanager
+    def locked(self):
+        with self._lock, self._all_stripes():
+            yield self
+
+    # Function to make room for at least `needed` rows, doubling the capacity
+    def _grow(self, needed):
+        capacity = len(self._price)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        size = len(self._names)
+        price = np.zeros(capacity, dtype=np.float64)
+        quantity = np.zeros(capacity, dtype=np.int64)
+        group = np.zeros(capacity, dtype=np.int32)
+        price[:size] = self._price[:size]
+        quantity[:size] = self._quantity[:size]
+        group[:size] = self._group[:size]
+        self._price = price
+        self._quantity = quantity
+        self._group = group
+        # The sale prices are recomputed at the new capacity on their next read
+        self._sale_epoch = -1
+
+    # Function to update the running aggregates for one row's old -> new values
+    def _update_row_aggregates(self, name, old_price, old_quantity, new_price, new_quantity):
+        if not self._value_stale:
+            self._total_value += new_price * new_quantity - old_price * old_quantity
+        self._total_units += new_quantity - old_quantity
+        if new_quantity == 0:
+            self._out_of_stock.add(name)
+        else:
+            self._out_of_stock.discard(name)
+
+    # Function to add a product, or overwrite it if the name already exists
+    @_locked
+    def add(self, name, price, quantity):
+        new_price, new_quantity = self._set_row(name, price, quantity)
+        self._after_mutation("add", name, new_price, new_quantity)
+
+    # Function to write one row and its aggregates (callers hold the locks)
+    def _set_row(self, name, price, quantity):
+        row = self._index.get(name)
+        if row is None:
+            row = len(self._names)
+            self._grow(row + 1)
+            self._index[name] = row
+            self._names.append(name)
+        old_price, old_quantity = float(self._sale_prices(row)), int(self._quantity[row])
+        self._price[row] = price
+        self._quantity[row] = quantity
+        self._reprice(row)
+        new_price, new_quantity = float(self._price[row]), int(self._quantity[row])
+        with self._aggregate_lock:
+            self._update_row_aggregates(name, old_price, old_quantity, float(self._sale_prices(row)), new_quantity)
+        return new_price, new_quantity
+
+    # Function to add or overwrite many products at once
+    @_locked
+    def extend(self, names, prices, quantities):
+        names = list(names)
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        if not (len(names) == len(prices) == len(quantities)):
+            raise ValueError("names, prices and quantities must have the same length")
+
+        rows = np.empty(len(names), dtype=np.int64)
+        self._grow(len(self._names) + len(names))
+        for i, name in enumerate(names):
+            row = self._index.get(name)
+            if row is None:
+                row = len(self._names)
+                self._index[name] = row
+                self._names.append(name)
+            rows[i] = row
+
+        # Only the touched rows contribute to the aggregate update
+        touched = np.unique(rows)
+        old_value = float(np.dot(self._sale_prices(touched), self._quantity[touched]))
+        old_units = int(self._quantity[touched].sum())
+        self._price[rows] = prices
+        self._quantity[rows] = quantities
+        self._reprice(touched)
+        if not self._value_stale:
+            self._total_value += float(np.dot(self._sale_prices(touched), self._quantity[touched])) - old_value
+        self._total_units += int(self._quantity[touched].sum()) - old_units
+        for row in touched.tolist():
+            self._out_of_stock.discard(self._names[row])
+        for row in touched[self._quantity[touched] == 0].tolist():
+            self._out_of_stock.add(self._names[row])
+        self._after_mutation("extend", names, prices, quantities)
+
+    # Function to remove a product; the last row is moved into the freed slot
+    @_locked
+    def remove(self, name):
+        row = self._index.pop(name)
+        self._update_row_aggregates(name, float(self._sale_prices(row)), int(self._quantity[row]), 0.0, 0)
+        self._out_of_stock.discard(name)
+        last = len(self._names) - 1
+        if row != last:
+            moved = self._names[last]
+            self._names[row] = moved
+            self._index[moved] = row
+            self._price[row] = self._price[last]
+            self._quantity[row] = self._quantity[last]
+            self._group[row] = self._group[last]
+            self._reprice(row)
+        self._names.pop()
+        self._price[last] = 0.0
+        self._quantity[last] = 0
+        self._group[last] = 0
+        self._after_mutation("remove", name, row)
+
+    # Function to drop every product, along with the product groups and discounts
+    @_locked
+    def clear(self):
+        self._index.clear()
+        self._names.clear()
+        self._price[:] = 0.0
+        self._quantity[:] = 0
+        self._group[:] = 0
+        self._reset_pricing()
+        self._value_stale = False
+        self._total_value = 0.0
+        self._total_units = 0
+        self._out_of_stock.clear()
+        self._after_mutation("clear")
+
+    # Function to replace the whole catalog in one locked step (e.g. after loading a file)
+    @_locked
+    def replace(self, names, prices, quantities):
+        self.clear()
+        self.extend(names, prices, quantities)
+
+    # Function to replace the whole catalog with another store's products, base prices,
+    # product groups and discounts in one locked step (e.g. after loading a snapshot).
+    # Listeners see the same events as for making those changes one by one.
+    @_locked
+    def replace_with(self, other):
+        names, prices, quantities = other.copy_columns(base_prices=True)
+        multiplier, groups, codes = other.copy_pricing()
+        self.replace(names, prices, quantities)
+        for code, (group, group_multiplier) in enumerate(groups, start=1):
+            members = np.flatnonzero(codes == code).tolist()
+            if members:
+                self.set_group([names[row] for row in members], group)
+            if group_multiplier != 1.0:
+                self.set_discount(group_multiplier, group)
+        if multiplier != 1.0:
+            self.set_discount(multiplier)
+
+    # Function to look up a product's (sale price, quantity)
+    def get(self, name):
+        row = self._index[name]
+        return float(self._sale_prices(row)), int(self._quantity[row])
+
+    def price(self, name):
+        return float(self._sale_prices(self._index[name]))
+
+    def base_price(self, name):
+        return float(self._price[self._index[name]])
+
+    # Function to get a product's group (None when it has none)
+    def group(self, name):
+        return self._group_names[self._group[self._index[name]]]
+
+    # Function to list the product group names, in the order they were created
+    def group_names(self):
+        return self._group_names[1:]
+
+    def quantity(self, name):
+        return int(self._quantity[self._index[name]])
+
+    # Function to copy (names, prices, quantities) consistently, e.g. for writing a file.
+    # The prices are the sale prices, or the base prices with `base_prices=True`.
+    @_locked
+    def copy_columns(self, base_prices=False):
+        prices = self.base_prices if base_prices else self.prices
+        return list(self._names), prices.copy(), self.quantities.copy()
+
+    # Function to copy the discounts and product groups consistently with copy_columns:
+    # (catalog-wide multiplier, [(group, multiplier)], group code per row). Group codes
+    # number the listed groups from 1; 0 means no group.
+    @_locked
+    def copy_pricing(self):
+        groups = list(zip(self._group_names[1:], self._group_multipliers[1:].tolist()))
+        return self._multiplier, groups, self._group[:len(self._names)].copy()
+
+    # Function to restore what copy_pricing returned (e.g. from a snapshot) without
+    # notifying listeners; `codes` has one group code per row
+    @_locked
+    def restore_pricing(self, multiplier, groups, codes):
+        self._reset_pricing()
+        for group, group_multiplier in groups:
+            code = self._group_code(group)
+            self._group_multipliers[code] = group_multiplier
+        self._group[:len(self._names)] = codes
+        self._set_multiplier_state(multiplier)
+
+    # Function to iterate over (name, price, quantity) tuples in row order
+    def items(self):
+        return zip(self._names, self.prices.tolist(), self.quantities.tolist())
+
+    # Function to buy `quantity` units of a product; returns False if there is not enough stock.
+    # The check and the decrement happen atomically under the product's lock stripe.
+    # Raises ValueError unless `quantity` is positive.
+    def purchase(self, name, quantity=1):
+        if quantity <= 0:
+            raise ValueError(f"purchase quantity must be positive, got {quantity}")
+        with self._stripe(name):
+            row = self._index[name]
+            if self._quantity[row] < quantity:
+                return False
+            self._quantity[row] -= quantity
+            sold_out = self._quantity[row] == 0
+            with self._aggregate_lock:
+                if not self._value_stale:
+                    self._total_value -= float(self._sale_prices(row)) * quantity
+                self._total_units -= quantity
+                if sold_out:
+                    self._out_of_stock.add(name)
+            self._notify("purchase", name, quantity)
+        if self.consistency_check:
+            self.check_aggregates()
+        return True
+
+    # Function to buy several products in one all-or-nothing step.
+    # `items` maps product name -> units (or is a sequence of (name, units) pairs).
+    # Returns the names that are unknown or short of stock; when that list is empty
+    # every line was bought, otherwise nothing was. Raises ValueError (buying nothing)
+    # unless every line's quantity is positive.
+    def purchase_many(self, items):
+        wanted = {}
+        for name, quantity in (items.items() if hasattr(items, "items") else items):
+            if quantity <= 0:
+                raise ValueError(f"purchase quantity of {name!r} must be positive, got {quantity}")
+            wanted[name] = wanted.get(name, 0) + quantity
+
+        # Lock each involved stripe once, in a fixed order, so checkouts can't deadlock
+        stripes = sorted({hash(name) % LOCK_STRIPES for name in wanted})
+        with contextlib.ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._stripes[stripe])
+            failed = [name for name, quantity in wanted.items()
+                      if name not in self._index or self._quantity[self._index[name]] < quantity]
+            if failed:
+                return failed
+
+            rows = np.fromiter((self._index[name] for name in wanted), dtype=np.int64, count=len(wanted))
+            quantities = np.fromiter(wanted.values(), dtype=np.int64, count=len(wanted))
+            self._quantity[rows] -= quantities
+            with self._aggregate_lock:
+                if not self._value_stale:
+                    self._total_value -= float(np.dot(self._sale_prices(rows), quantities))
+                self._total_units -= int(quantities.sum())
+                for row in rows[self._quantity[rows] == 0].tolist():
+                    self._out_of_stock.add(self._names[row])
+            for name, quantity in wanted.items():
+                self._notify("purchase", name, quantity)
+        if self.consistency_check:
+            self.check_aggregates()
+        return []
+
+    # Function to overwrite one product's price and quantity from the source of truth
+    # (e.g. after an atomic update in MongoDB). Listeners get a "sync" event, which
+    # writers back to that source must ignore.
+    def sync(self, name, price, quantity):
+        with self._stripe(name):
+            if name in self._index:
+                self._set_row(name, price, quantity)
+                self._notify("sync", name, price, quantity)
+                return
+        # A product this cache has not seen yet changes the catalog's shape
+        with self._lock, self._all_stripes():
+            self._set_row(name, price, quantity)
+            self._notify("sync", name, price, quantity)
+
+    # Function to get a group's code, creating the group on first use
+    def _group_code(self, group):
+        code = self._group_codes.get(group)
+        if code is None:
+            code = len(self._group_names)
+            self._group_codes[group] = code
+            self._group_names.append(group)
+            self._group_multipliers = np.append(self._group_multipliers, 1.0)
+        return code
+
+    # Function to put products in a group (None: take them out of their group)
+    @_locked
+    def set_group(self, names, group):
+        names = list(names)
+        rows = np.fromiter((self._index[name] for name in names), dtype=np.int64, count=len(names))
+        old_value = float(np.dot(self._sale_prices(rows), self._quantity[rows]))
+        self._group[rows] = self._group_code(group)
+        self._reprice(rows)
+        if not self._value_stale:
+            self._total_value += float(np.dot(self._sale_prices(rows), self._quantity[rows])) - old_value
+        self._after_mutation("group", names, group)
+
+    # Function to get the price multiplier of a group (None: the whole catalog)
+    def discount_multiplier(self, group=None):
+        if group is None:
+            return self._multiplier
+        code = self._group_codes.get(group)
+        return 1.0 if code is None else float(self._group_multipliers[code])
+
+    def _reset_pricing(self):
+        self._group_names = [None]
+        self._group_codes = {None: 0}
+        self._group_multipliers = np.ones(1, dtype=np.float64)
+        self._set_multiplier_state(1.0)
+
+    # Function to start a new discount epoch: the sale prices and the stock value are
+    # recomputed when next read
+    def _set_multiplier_state(self, multiplier):
+        self._multiplier = multiplier
+        self._discounted = multiplier != 1.0 or bool((self._group_multipliers != 1.0).any())
+        self._discount_epoch += 1
+        self._value_stale = True
+
+    # Function to set the price multiplier of a group (None: the whole catalog). It
+    # touches no rows, so it takes constant time whatever the size of the catalog.
+    @_locked
+    def set_discount(self, multiplier, group=None):
+        multiplier = float(multiplier)
+        if group is None:
+            self._set_multiplier_state(multiplier)
+        else:
+            code = self._group_code(group)
+            self._group_multipliers[code] = multiplier
+            self._set_multiplier_state(self._multiplier)
+        self._after_mutation("discount", multiplier, group)
+
+    # Function to apply a percentage discount to every product price, or to the prices
+    # of one group. Discounts stack: two 10% discounts take 19% off the base price.
+    @_locked
+    def apply_discount(self, discount_percentage, group=None):
+        self.set_discount(self.discount_multiplier(group) * (1 - discount_percentage / 100), group)
+
+    # Function to end the discounts of a group (None: the catalog-wide discount)
+    def revert_discount(self, group=None):
+        self.set_discount(1.0, group)
+
+    # Total stock value (sum of sale price * quantity), maintained incrementally; after a
+    # discount it is recomputed from the columns once, on the first call
+    def total_stock_value(self):
+        if self._value_stale:
+            with self._lock, self._all_stripes():
+                prices = self.prices
+                with self._aggregate_lock:
+                    if self._value_stale:
+                        self._total_value = float(np.dot(prices, self.quantities))
+                        self._value_stale = False
+        return self._total_value
+
+    # Total number of units in stock, maintained incrementally
+    def total_units(self):
+        return self._total_units
+
+    # Function to list the names of products with zero quantity
+    def out_of_stock(self):
+        return sorted(self._out_of_stock)
+
+    # Function to recompute every aggregate from the columns, ignoring the running values
+    def recompute_aggregates(self):
+        total_value, total_units, out_of_stock_rows = column_aggregates(self.prices, self.quantities)
+        out_of_stock = {self._names[row] for row in out_of_stock_rows.tolist()}
+        return total_value, total_units, out_of_stock
+
+    # Function to compare the running aggregates against a full recomputation
+    def check_aggregates(self):
+        with self._lock, self._all_stripes():
+            # Bring the sale prices up to date before taking the aggregate lock
+            self.prices
+            with self._aggregate_lock:
+                self._check_aggregates()
+
+    def _check_aggregates(self):
+        total_value, total_units, out_of_stock = self.recompute_aggregates()
+        problems = []
+        if not self._value_stale and not math.isclose(self._total_value, total_value, rel_tol=1e-9, abs_tol=1e-6):
+            problems.append(f"total value {self._total_value} != {total_value}")
+        if self._total_units != total_units:
+            problems.append(f"total units {self._total_units} != {total_units}")
+        if self._out_of_stock != out_of_stock:
+            problems.append(f"out-of-stock set differs by {sorted(self._out_of_stock ^ out_of_stock)}")
+        if problems:
+            raise RuntimeError("ProductStore aggregates out of sync: " + "; ".join(problems))
+
+    # Function to run the consistency check (when enabled) and notify listeners
+    def _after_mutation(self, event, *args):
+        if self.consistency_check:
+            self.check_aggregates()
+        self._notify(event, *args)
+
+    def _notify(self, event, *args):
+        self._version = next(self._versions)
+        for listener in self._listeners:
+            listener(event, *args)
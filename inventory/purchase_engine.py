@@ -0,0 +1,136 @@
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .sales_events import sales_history
+
+# Server error code for "transactions need a replica set or mongos"
+ILLEGAL_OPERATION = 20
+
+
+# Function to atomically buy `quantity` units in MongoDB.
+# The quantity >= n guard and the $inc run as one server-side update, so concurrent
+# buyers (in any session or process) can never oversell. Returns the product's
+# (price, quantity) after the purchase, or None when there is not enough stock.
+def purchase_in_mongo(collection, name, quantity=1):
+    product = collection.find_one_and_update(
+        {"name": name, "quantity": {"$gte": quantity}},
+        {"$inc": {"quantity": -quantity}},
+        projection={"_id": 0, "price": 1, "quantity": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if product is None:
+        return None
+    return product["price"], product["quantity"] - quantity
+
+
+# Function to read the current (price, quantity) of some products in one query
+def _current_products(collection, names, session=None):
+    return {product["name"]: (product["price"], product["quantity"])
+            for product in collection.find({"name": {"$in": list(names)}},
+                                           {"_id": 0, "name": 1, "price": 1, "quantity": 1}, session=session)}
+
+
+# Function to apply a whole cart inside a transaction: one read of the stock and one
+# guarded bulk_write, committed only if every line matched. Returns (products, failed names).
+# The stock is read before the writes: both see the transaction's snapshot (a concurrent
+# change to a cart line makes the write fail with a conflict), so the lines short of stock
+# are exactly the ones whose guard did not match. Read after the writes, the transaction's
+# own decrements would make lines that did go through look short too.
+# with_transaction reruns the whole callback on a write conflict (TransientTransactionError)
+# and retries the commit on UnknownTransactionCommitResult, until its time limit.
+def _checkout_in_transaction(collection, wanted):
+    operations = [UpdateOne({"name": name, "quantity": {"$gte": quantity}}, {"$inc": {"quantity": -quantity}})
+                  for name, quantity in wanted.items()]
+
+    def checkout(session):
+        before = _current_products(collection, wanted, session)
+        failed = [name for name, quantity in wanted.items() if before.get(name, (0, 0))[1] < quantity]
+        if failed:
+            session.abort_transaction()
+            return {}, failed
+        result = collection.bulk_write(operations, ordered=False, session=session)
+        if result.modified_count != len(operations):
+            # A guard failed despite the read above; which one isn't known
+            session.abort_transaction()
+            return {}, list(wanted)
+        return {name: (before[name][0], before[name][1] - quantity) for name, quantity in wanted.items()}, []
+
+    with collection.database.client.start_session() as session:
+        return session.with_transaction(checkout)
+
+
+# Function to apply a cart without transactions (standalone mongod, mongomock):
+# guarded updates one line at a time, undoing the applied lines if one fails
+def _checkout_with_compensation(collection, wanted):
+    products = {}
+    for name, quantity in wanted.items():
+        product = purchase_in_mongo(collection, name, quantity)
+        if product is None:
+            if products:
+                collection.bulk_write([UpdateOne({"name": applied}, {"$inc": {"quantity": wanted[applied]}})
+                                       for applied in products])
+            return {}, [name]
+        products[name] = product
+    return products, []
+
+
+# Function to buy a whole cart in MongoDB, all or nothing.
+# Returns ({name: (price, quantity after)}, failed names); nothing is bought if any
+# line is unknown or short of stock, or if the transaction kept conflicting with
+# other checkouts until its retries ran out.
+def purchase_many_in_mongo(collection, wanted):
+    try:
+        return _checkout_in_transaction(collection, wanted)
+    except NotImplementedError:
+        pass
+    except PyMongoError as error:
+        if error.has_error_label("TransientTransactionError"):
+            # The transaction was aborted, so nothing was bought
+            return {}, list(wanted)
+        if error.has_error_label("UnknownTransactionCommitResult"):
+            raise ValueError("The checkout could not be confirmed; check your stock before trying again.") from error
+        if not isinstance(error, OperationFailure) or error.code != ILLEGAL_OPERATION:
+            raise
+    return _checkout_with_compensation(collection, wanted)
+
+
+# Purchase engine in front of a ProductStore.
+# Without a collection, purchases are decided by the store itself (atomic under the
+# product's lock stripe) and persisted by whatever listens to the store, e.g. the
+# write-behind queue. With a collection, MongoDB decides atomically and the store is
+# only synced as a cache, which stays correct when several processes share the catalog;
+# the purchases are then added to the store's sales history here, as the store only
+# sees "sync" events.
+class PurchaseEngine:
+    def __init__(self, store, collection=None):
+        self.store = store
+        self.collection = collection
+
+    # Function to buy `quantity` units of a product; returns False if there is not enough stock
+    def purchase(self, name, quantity=1):
+        if quantity <= 0:
+            raise ValueError("Purchase quantity must be positive.")
+        if self.collection is None:
+            return self.store.purchase(name, quantity)
+
+        product = purchase_in_mongo(self.collection, name, quantity)
+        if product is None:
+            return False
+        self.store.sync(name, *product)
+        sales_history(self.store).record(name, quantity)
+        return True
+
+    # Function to check out a cart ({name: units}) all or nothing, like
+    # ProductStore.purchase_many. Returns the names that could not be bought; an
+    # empty list means success.
+    def purchase_many(self, cart):
+        wanted = {name: quantity for name, quantity in cart.items() if quantity > 0}
+        if self.collection is None:
+            return self.store.purchase_many(wanted)
+
+        products, failed = purchase_many_in_mongo(self.collection, wanted)
+        history = sales_history(self.store)
+        for name, (price, quantity) in products.items():
+            self.store.sync(name, price, quantity)
+            history.record(name, wanted[name])
+        return failed
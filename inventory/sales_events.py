@@ -0,0 +1,145 @@
+# Purchase history of a ProductStore for sell-through reports: units sold per product,
+# units per hour, top sellers and products about to sell out, over a recent window.
+#
+#   history = sales_history(store)              # subscribed on first use
+#   history.top_sellers(60 * 60, 10)            # best sellers of the last hour
+#
+# Every purchase is written into a ring buffer of three preallocated NumPy columns
+# (timestamp, product row, units), so recording one allocates nothing and memory stays
+# at SALES_HISTORY_EVENTS events; the oldest events are overwritten once it is full.
+# Window reports select the events in the window with one mask and sum them per product
+# with np.bincount. Rows follow the store: when a product is removed and the last row is
+# moved into its slot, the buffered events are renumbered the same way.
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+
+# Purchase events kept per store (16 bytes each)
+SALES_HISTORY_EVENTS = int(os.environ.get("SALES_HISTORY_EVENTS", str(1 << 20)))
+SECONDS_PER_HOUR = 3600.0
+
+
+# Ring buffer of (timestamp, row, units) purchase events with windowed aggregations
+class SalesHistory:
+    def __init__(self, store, capacity=SALES_HISTORY_EVENTS, clock=time.time):
+        self._store = weakref.ref(store)
+        self.capacity = max(int(capacity), 1)
+        self.clock = clock
+        self._time = np.zeros(self.capacity, dtype=np.float64)
+        self._row = np.zeros(self.capacity, dtype=np.int32)
+        self._quantity = np.zeros(self.capacity, dtype=np.int32)
+        # Events recorded so far; the next one goes to slot _count % capacity
+        self._count = 0
+        # When recording started (creation or the last "clear")
+        self._started = clock()
+        self._lock = threading.Lock()
+
+    # ProductStore listener: record purchases, follow rows moved by removals
+    def __call__(self, event, *args):
+        if event == "purchase":
+            self.record(*args)
+        elif event == "remove":
+            self._remove_row(args[1])
+        elif event == "clear":
+            with self._lock:
+                self._count = 0
+                self._started = self.clock()
+
+    # Function to record `quantity` units of a product sold at `timestamp` (default: now)
+    def record(self, name, quantity, timestamp=None):
+        row = self._store().row(name)
+        if row is None:
+            return
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            slot = self._count % self.capacity
+            self._time[slot] = timestamp
+            self._row[slot] = row
+            self._quantity[slot] = quantity
+            self._count += 1
+
+    # Function to renumber events after the store removed `row` and moved its last row
+    # there: the removed product's events are dropped (row -1)
+    def _remove_row(self, row):
+        last = len(self._store())
+        with self._lock:
+            rows = self._row[:min(self._count, self.capacity)]
+            rows[rows == row] = -1
+            if row != last:
+                rows[rows == last] = row
+
+    # Number of events currently held
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    # Function to get how much of the last `window_seconds` the history covers: less than
+    # the window while recording has not been going on that long, or once old events
+    # have been overwritten
+    def covered_seconds(self, window_seconds, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            if self._count <= self.capacity:
+                start = self._started
+            else:
+                # When full, the slot written next holds the oldest event
+                start = float(self._time[self._count % self.capacity])
+        return max(min(window_seconds, now - start), 0.0)
+
+    # Function to sum the units sold per row over the last `window_seconds`.
+    # Returns (units per row, seconds covered; see covered_seconds).
+    def units_sold(self, window_seconds):
+        store = self._store()
+        now = self.clock()
+        with self._lock:
+            held = min(self._count, self.capacity)
+            in_window = (self._time[:held] >= now - window_seconds) & (self._row[:held] >= 0)
+            rows, quantities = self._row[:held][in_window], self._quantity[:held][in_window]
+        units = np.bincount(rows, weights=quantities, minlength=len(store))[:len(store)]
+        return units.astype(np.int64), self.covered_seconds(window_seconds, now)
+
+    # Function to get (units sold, units sold per hour) for every row over the last `window_seconds`
+    def velocity(self, window_seconds):
+        units, covered = self.units_sold(window_seconds)
+        return units, units * (SECONDS_PER_HOUR / max(covered, 1e-9))
+
+    # Function to turn rows into (name, units sold, units per hour, quantity, hours of
+    # stock left at that rate) tuples
+    def _sellers(self, store, rows, units, per_hour):
+        quantities = store.quantities[rows]
+        with np.errstate(divide="ignore"):
+            hours_left = np.where(per_hour[rows] > 0, quantities / per_hour[rows], np.inf)
+        names = store.names
+        return list(zip([names[row] for row in rows.tolist()], units[rows].tolist(), per_hour[rows].tolist(),
+                        quantities.tolist(), hours_left.tolist()))
+
+    # Function to list the `n` best sellers of the last `window_seconds`, best first
+    def top_sellers(self, window_seconds, n):
+        store = self._store()
+        units, per_hour = self.velocity(window_seconds)
+        sold = np.flatnonzero(units)
+        if len(sold) > n:
+            sold = sold[np.argpartition(units[sold], -n)[-n:]]
+        rows = sold[np.argsort(-units[sold], kind="stable")]
+        return self._sellers(store, rows, units, per_hour)
+
+    # Function to list the `n` products that will sell out soonest at the rate of the last
+    # `window_seconds` (products still in stock that sold in the window), soonest first
+    def running_out(self, window_seconds, n):
+        store = self._store()
+        units, per_hour = self.velocity(window_seconds)
+        selling = np.flatnonzero((units > 0) & (store.quantities > 0))
+        hours_left = store.quantities[selling] / per_hour[selling]
+        if len(selling) > n:
+            keep = np.argpartition(hours_left, n)[:n]
+            selling, hours_left = selling[keep], hours_left[keep]
+        rows = selling[np.argsort(hours_left, kind="stable")]
+        return self._sellers(store, rows, units, per_hour)
+
+
+# Function to get the sales history of a ProductStore, created on first use and then fed
+# by the store's events. Purchases made before that are not in it.
+def sales_history(store):
+    return store.attachment(SalesHistory, SalesHistory)
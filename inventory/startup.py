@@ -0,0 +1,49 @@
+# Startup timing: a per-phase breakdown of where time-to-first-render goes.
+# A front end creates a StartupTimer before its other imports and marks the end of each
+# phase (imports, store loading, widgets, first render, ...). Set STARTUP_TIMING=1 to
+# print the report to stderr; otherwise it is only logged at DEBUG level.
+#
+#   STARTUP_TIMING=1 python panda_prac.py
+#   STARTUP_TIMING=1 streamlit run dabconnection_main.py   # one report per rerun
+import logging
+import os
+import sys
+import time
+
+STARTUP_TIMING = os.environ.get("STARTUP_TIMING", "") not in ("", "0")
+
+logger = logging.getLogger(__name__)
+
+
+# Records how long each startup phase took, in the order the phases ran
+class StartupTimer:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.phases = []
+        self._phase_started = self.started
+
+    # Function to end the current phase under `name`; the next phase starts now
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._phase_started))
+        self._phase_started = now
+
+    # Function to get the seconds from the timer's creation to the last mark
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    # Function to format the breakdown as text, one line per phase with its share of the total
+    def report(self):
+        total = self.total() or 1e-9
+        lines = [f"{self.label} startup: {self.total() * 1000:.1f} ms"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<20} {seconds * 1000:>9.1f} ms {seconds / total:>6.1%}")
+        return "\n".join(lines)
+
+    # Function to emit the report: to stderr with STARTUP_TIMING set, else at DEBUG level
+    def finish(self):
+        if STARTUP_TIMING:
+            print(self.report(), file=sys.stderr)
+        else:
+            logger.debug("%s", self.report())
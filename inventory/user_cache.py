@@ -0,0 +1,96 @@
+# In-process cache of customer records for logins, so a customer logging in again does
+# not cost a round trip to MongoDB.
+#
+#   user = USER_CACHE.get(users, username, lambda: users.find(username))
+#
+# Entries hold the projected user record (password hash and role) for USER_CACHE_TTL
+# seconds; unknown usernames are remembered as None for USER_CACHE_NEGATIVE_TTL seconds,
+# so repeated attempts with a mistyped name don't hit the database either. At most
+# USER_CACHE_ENTRIES usernames are kept, least recently used first out. Registration
+# and imports invalidate the usernames they create. A change made by another process
+# (e.g. a password reset) is seen once the entry expires.
+import collections
+import os
+import threading
+import time
+
+USER_CACHE_ENTRIES = int(os.environ.get("USER_CACHE_ENTRIES", "10000"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "300"))
+USER_CACHE_NEGATIVE_TTL = float(os.environ.get("USER_CACHE_NEGATIVE_TTL", "30"))
+
+
+# LRU cache of user records (or None for unknown users) that expire after a TTL
+class UserCache:
+    def __init__(self, max_entries=USER_CACHE_ENTRIES, ttl=USER_CACHE_TTL, negative_ttl=USER_CACHE_NEGATIVE_TTL,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        # Bumped by invalidate(), so a lookup that raced an invalidation isn't cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    # Entries are keyed by the user store's name (see inventory/user_store.py) and username
+    @staticmethod
+    def _key(users, username):
+        return users.name, username
+
+    # Function to get a user's record, calling load() (the database lookup) when it is
+    # not cached or has expired. A None result is cached for the shorter negative TTL.
+    def get(self, users, username, load):
+        key = self._key(users, username)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                if entry[1] is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        user = load()
+        expires = self.clock() + (self.ttl if user is not None else self.negative_ttl)
+        with self._lock:
+            if generation != self._generation:
+                return user
+            self._entries[key] = (expires, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return user
+
+    # Function to forget some usernames (e.g. after creating those accounts)
+    def invalidate(self, users, *usernames):
+        with self._lock:
+            self._generation += 1
+            for username in usernames:
+                self._entries.pop(self._key(users, username), None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Function to get the counters as a dict (e.g. for the Performance page)
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "negative_hits": self.negative_hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else None}
+
+
+# The process-wide cache used by inventory.auth
+USER_CACHE = UserCache()
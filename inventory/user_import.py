@@ -0,0 +1,165 @@
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .auth import normalize_username
+from .passwords import hash_passwords
+from .user_cache import USER_CACHE
+
+# Number of users hashed, deduplicated and inserted per round trip
+BATCH_SIZE = 1000
+
+
+# Outcome of a bulk import: how many users were inserted and which rows failed
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failures = []  # (line number, username, reason)
+        self.elapsed = 0.0
+
+    def add_failure(self, line, username, reason):
+        self.failures.append((line, username, reason))
+
+    @property
+    def users_per_second(self):
+        return self.inserted / self.elapsed if self.elapsed else 0.0
+
+
+# Function to read (line number, username, password) rows from CSV or JSONL text.
+# CSV files need a header with "username" and "password" columns; JSONL files hold
+# one {"username": ..., "password": ...} object per line. A bad JSONL line is yielded
+# as (line number, None, reason).
+def read_users(stream, file_format):
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row.get("username") or "", row.get("password") or ""
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None, "Invalid JSON line."
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "JSON line is not an object."
+                continue
+            yield line_number, str(record.get("username") or ""), str(record.get("password") or "")
+    else:
+        raise ValueError(f"Unsupported user file format: {file_format!r}")
+
+
+# Function to guess the file format from a file name
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return "jsonl" if extension in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+# Function to validate one batch, dropping bad rows and usernames seen earlier in the file
+def _clean_batch(batch, seen, report):
+    rows = []
+    for line, username, password in batch:
+        if username is None:
+            report.add_failure(line, "", password)
+            continue
+        # Same normalisation as the registration form
+        username = normalize_username(username)
+        if not username or not password:
+            report.add_failure(line, username, "Username and password are required.")
+        elif username in seen:
+            report.add_failure(line, username, "Duplicate username in import file.")
+        else:
+            seen.add(username)
+            rows.append((line, username, password))
+    return rows
+
+
+# Function to insert one cleaned batch into a user store (see inventory/user_store.py):
+# one lookup to skip existing users, one insert_many
+def _import_batch(users, rows, hashed, report):
+    existing = users.existing([username for _, username, _ in rows])
+
+    documents, document_rows = [], []
+    for (line, username, _), password_hash in zip(rows, hashed.result()):
+        if username in existing:
+            report.add_failure(line, username, "Username already exists.")
+        else:
+            documents.append({"username": username, "password": password_hash, "role": "customer"})
+            document_rows.append((line, username))
+    if not documents:
+        return
+
+    try:
+        inserted, failures = users.insert_many(documents)
+    finally:
+        # Usernames cached as unknown by earlier login attempts can log in now
+        USER_CACHE.invalidate(users, *(username for _, username in document_rows))
+    report.inserted += inserted
+    for index, duplicate, message in failures:
+        line, username = document_rows[index]
+        report.add_failure(line, username, "Username already exists." if duplicate else message)
+
+
+# Function to bulk import customers from a CSV/JSONL text stream into a user store.
+# Password hashing for the next batches runs in a process pool while the current batch
+# is being deduplicated and written.
+def import_users(stream, users, file_format="csv", batch_size=BATCH_SIZE, workers=None, progress=None):
+    report = ImportReport()
+    started = time.perf_counter()
+    seen = set()
+    rows_iter = read_users(stream, file_format)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        while True:
+            # Keep a couple of batches hashing ahead of the writer
+            while len(pending) < 2:
+                batch = list(islice(rows_iter, batch_size))
+                if not batch:
+                    break
+                rows = _clean_batch(batch, seen, report)
+                pending.append((rows, executor.submit(hash_passwords, [password for _, _, password in rows])))
+            if not pending:
+                break
+            rows, hashed = pending.pop(0)
+            if rows:
+                _import_batch(users, rows, hashed, report)
+            if progress is not None:
+                progress(report)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+# Function to bulk import customers from a file path
+def import_users_file(path, users, batch_size=BATCH_SIZE, workers=None, progress=None):
+    with open(path, newline="", encoding="utf-8") as stream:
+        return import_users(stream, users, detect_format(path), batch_size, workers, progress)
+
+
+# Function to bulk import customers from an uploaded binary file (e.g. st.file_uploader)
+def import_users_upload(uploaded, users, batch_size=BATCH_SIZE, workers=None, progress=None):
+    stream = io.TextIOWrapper(uploaded, encoding="utf-8", newline="")
+    return import_users(stream, users, detect_format(uploaded.name), batch_size, workers, progress)
+
+
+if __name__ == "__main__":
+    from .user_store import get_user_store
+
+    parser = argparse.ArgumentParser(description="Bulk import customer accounts from a CSV or JSONL file.")
+    parser.add_argument("path", help="CSV (username,password header) or JSONL file of users")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="password hashing processes")
+    args = parser.parse_args()
+
+    result = import_users_file(args.path, get_user_store(), args.batch_size, args.workers)
+    print(f"Inserted {result.inserted} users in {result.elapsed:.2f}s ({result.users_per_second:.0f} users/s)")
+    for line, username, reason in result.failures:
+        print(f"line {line}: {username}: {reason}")
@@ -0,0 +1,199 @@
+# Customer accounts behind one small interface, so logins and registration don't depend
+# on where the accounts live. Two backends:
+#   "mongo"  - the users collection of the shared MongoDB deployment (inventory/mongo_pool.py)
+#   "sqlite" - a local SQLite file: no network hop per login, and no server needed for
+#              tests or single-machine deployments
+# USER_STORE picks the backend and USER_DB_PATH the SQLite file.
+#
+#   users = get_user_store()
+#   users.insert("alice", hash_password("secret"), "customer")
+#   users.find("alice")    # {"password": <hash>, "role": "customer"} or None
+import abc
+import os
+import sqlite3
+import threading
+import weakref
+
+USER_STORE = os.environ.get("USER_STORE", "mongo")
+USER_DB_PATH = os.environ.get("USER_DB_PATH", "users.sqlite3")
+# How long a SQLite write waits for another process's write to finish, in milliseconds
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("USER_DB_BUSY_TIMEOUT_MS", "5000"))
+# Usernames bound in one IN (...) query (SQLite's lowest default limit on bound variables)
+SQLITE_MAX_VARIABLES = 999
+# Mongo error code for a unique index violation
+DUPLICATE_KEY = 11000
+
+
+# Interface of a user store. Records are {"password": <hash>, "role": <role>} dicts;
+# `name` identifies the store in caches (see inventory/user_cache.py).
+class UserStore(abc.ABC):
+    name = None
+
+    # Function to get a user's record, or None when the username is unknown
+    @abc.abstractmethod
+    def find(self, username):
+        ...
+
+    # Function to create a user; returns False when the username is taken
+    @abc.abstractmethod
+    def insert(self, username, password_hash, role):
+        ...
+
+    # Function to get which of some usernames already exist, as a set
+    @abc.abstractmethod
+    def existing(self, usernames):
+        ...
+
+    # Function to create many users from {"username", "password", "role"} documents.
+    # Every document is tried; returns (inserted, [(document index, duplicate, message)]).
+    @abc.abstractmethod
+    def insert_many(self, documents):
+        ...
+
+    def close(self):
+        pass
+
+
+# User store on a MongoDB collection with a unique username index
+class MongoUserStore(UserStore):
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.full_name
+
+    def find(self, username):
+        return self.collection.find_one({"username": username}, {"password": 1, "role": 1, "_id": 0})
+
+    def insert(self, username, password_hash, role):
+        from pymongo.errors import DuplicateKeyError
+
+        try:
+            self.collection.insert_one({"username": username, "password": password_hash, "role": role})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def existing(self, usernames):
+        return {user["username"] for user in self.collection.find({"username": {"$in": list(usernames)}},
+                                                                  {"username": 1, "_id": 0})}
+
+    def insert_many(self, documents):
+        from pymongo.errors import BulkWriteError
+
+        if not documents:
+            return 0, []
+        try:
+            result = self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as error:
+            # With ordered=False every other document was still written
+            failures = [(write_error["index"], write_error.get("code") == DUPLICATE_KEY,
+                         write_error.get("errmsg", "Insert failed."))
+                        for write_error in error.details.get("writeErrors", [])]
+            return error.details.get("nInserted", 0), failures
+        return len(result.inserted_ids), []
+
+
+# User store in a SQLite file. The username is the table's primary key (a unique index,
+# clustered with WITHOUT ROWID) and the journal runs in WAL mode. Each thread gets its
+# own connection, so logins read in parallel and don't wait for a registration being
+# written; concurrent writes queue on SQLite's busy timeout. Queries are parameterized
+# statements, which sqlite3 prepares once per connection and reuses.
+class SQLiteUserStore(UserStore):
+    def __init__(self, path=USER_DB_PATH):
+        self.path = path
+        self.name = f"sqlite:{os.path.abspath(path)}"
+        # Connection of each thread, dropped (and closed) once the thread is gone:
+        # Streamlit runs every rerun on a new thread
+        self._connections = weakref.WeakKeyDictionary()
+        self._connections_lock = threading.Lock()
+        connection = self._connection()
+        with connection:
+            # WAL mode is stored in the database file; the other pragmas are per connection
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS users ("
+                               "username TEXT PRIMARY KEY, password TEXT NOT NULL, role TEXT NOT NULL"
+                               ") WITHOUT ROWID")
+
+    # Function to get the calling thread's connection, opening it on first use
+    def _connection(self):
+        thread = threading.current_thread()
+        connection = self._connections.get(thread)
+        if connection is None:
+            # Closed by close() or garbage collection, possibly on another thread
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            # Durable at each checkpoint rather than each commit: safe against crashes in WAL mode
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            with self._connections_lock:
+                self._connections[thread] = connection
+        return connection
+
+    def find(self, username):
+        row = self._connection().execute("SELECT password, role FROM users WHERE username = ?",
+                                         (username,)).fetchone()
+        return None if row is None else {"password": row[0], "role": row[1]}
+
+    def insert(self, username, password_hash, role):
+        connection = self._connection()
+        try:
+            with connection:
+                connection.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                                   (username, password_hash, role))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    # One IN (...) query per SQLITE_MAX_VARIABLES usernames; full chunks share one statement
+    def existing(self, usernames):
+        usernames = list(usernames)
+        connection = self._connection()
+        found = set()
+        for start in range(0, len(usernames), SQLITE_MAX_VARIABLES):
+            chunk = usernames[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(row[0] for row in connection.execute(
+                f"SELECT username FROM users WHERE username IN ({placeholders})", chunk))
+        return found
+
+    # All documents go in one transaction; a taken username is skipped, not an error
+    def insert_many(self, documents):
+        failures = []
+        connection = self._connection()
+        with connection:
+            for index, document in enumerate(documents):
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)",
+                    (document["username"], document["password"], document["role"]))
+                if cursor.rowcount == 0:
+                    failures.append((index, True, "Username already exists."))
+        return len(documents) - len(failures), failures
+
+    def close(self):
+        with self._connections_lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+
+# Function to open a user store: `backend` is "mongo" or "sqlite"
+def open_user_store(backend=USER_STORE, path=USER_DB_PATH):
+    if backend == "mongo":
+        from .mongo_pool import get_collection
+        return MongoUserStore(get_collection("users"))
+    if backend == "sqlite":
+        return SQLiteUserStore(path)
+    raise ValueError(f"Unknown user store backend: {backend!r} (expected 'mongo' or 'sqlite')")
+
+
+_user_store = None
+_user_store_lock = threading.Lock()
+
+
+# Function to get the process-wide user store configured by USER_STORE, opening it on first use
+def get_user_store():
+    global _user_store
+    if _user_store is None:
+        with _user_store_lock:
+            if _user_store is None:
+                _user_store = open_user_store()
+    return _user_store
@@ -0,0 +1,113 @@
+# Derived views of a ProductStore (sorted table rows, picker options, reports, CSV bytes)
+# memoized on the store's version. Streamlit re-executes the whole app script on every
+# interaction; with the views cached, a rerun that changed nothing only looks them up.
+#
+#   rows = cached_view(store, "product_rows", product_rows, search, sort_by)
+#
+# Each (view, arguments) pair keeps one entry: the value computed at some store version.
+# It is reused while the version is unchanged and recomputed after any mutation. The
+# least recently used entries are evicted beyond VIEW_CACHE_ENTRIES entries or
+# VIEW_CACHE_BYTES of (estimated) memory per store.
+import collections
+import os
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+VIEW_CACHE_ENTRIES = int(os.environ.get("VIEW_CACHE_ENTRIES", "64"))
+VIEW_CACHE_BYTES = int(os.environ.get("VIEW_CACHE_BYTES", str(256 * 1024 * 1024)))
+# Items of a list/tuple value sampled to estimate its size
+SIZE_SAMPLE = 100
+
+
+# Function to estimate the memory held by a cached value, in bytes
+def estimate_size(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        sample = value[:SIZE_SAMPLE]
+        per_item = sum(estimate_size(item) for item in sample) / len(sample)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    return sys.getsizeof(value)
+
+
+# LRU cache of one store's derived views, bounded by entry count and estimated bytes
+class ViewCache:
+    def __init__(self, max_entries=VIEW_CACHE_ENTRIES, max_bytes=VIEW_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    # Function to get the value of `key` at `version`, calling compute() when the cached
+    # value is missing or from another version
+    def get(self, key, version, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        size = estimate_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            # A value larger than the whole budget is returned but not kept
+            if size <= self.max_bytes:
+                self._entries[key] = (version, value, size)
+                self._bytes += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+# Function to get the view cache of a ProductStore, creating it on first use
+def view_cache(store):
+    cache = _caches.get(store)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(store, ViewCache())
+    return cache
+
+
+# Function to get compute(store, *args) from the cache, recomputing it only when the
+# store has changed since it was cached. `name` identifies the view; `args` must be hashable.
+def cached_view(store, name, compute, *args):
+    # Read the version before computing: a mutation racing the computation then bumps
+    # the version past the cached entry instead of hiding behind it
+    version = store.version
+    return view_cache(store).get((name, args), version, lambda: compute(store, *args))
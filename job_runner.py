@@ -0,0 +1,149 @@
+import concurrent.futures
+import threading
+import tkinter as tk
+from tkinter import messagebox, ttk
+
+# Worker threads for background jobs (pandas/NumPy file I/O releases the GIL)
+JOB_WORKERS = 2
+# How often the Tk thread polls running jobs for progress and results, in milliseconds
+POLL_MS = 100
+
+
+# Raised inside a job by Job.progress() once the job has been cancelled
+class JobCancelled(Exception):
+    pass
+
+
+# One background job. The worker reports progress and notices cancellation through it;
+# the Tk thread only reads the latest progress when it polls.
+class Job:
+    def __init__(self, label, done, failed, writes):
+        self.label = label
+        self.done = done
+        self.failed = failed
+        self.writes = writes
+        # Fraction complete, or None while the job can't tell
+        self.fraction = None
+        self.text = f"{label}..."
+        self.future = None
+        self._cancelled = threading.Event()
+
+    # Function for the worker to report progress; raises JobCancelled once cancelled,
+    # so the work stops at its next progress report
+    def progress(self, fraction=None, text=None):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self.fraction = fraction
+        if text is not None:
+            self.text = text
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+# Runs blocking work (file loads and saves, reports) on a thread pool so the Tk window
+# keeps responding. Results come back through root.after polling, and the `done` and
+# `failed` callbacks run on the Tk thread. A status bar shows the running job with a
+# progress bar and a Cancel button. A job that writes the catalog conflicts with every
+# other job; jobs that only read it may run side by side.
+class JobRunner:
+    def __init__(self, root, parent=None, workers=JOB_WORKERS):
+        self.root = root
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tk-job")
+        self._jobs = []
+        self._indeterminate = False
+        self.frame = tk.Frame(parent or root)
+        self.status_label = tk.Label(self.frame, text="Ready", anchor=tk.W, width=40)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.progressbar = ttk.Progressbar(self.frame, length=200)
+        self.progressbar.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = tk.Button(self.frame, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT)
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    # Function to find a running job that a new job would conflict with, or None
+    def conflict(self, writes=False):
+        for job in self._jobs:
+            if writes or job.writes:
+                return job
+        return None
+
+    # Function to run `work(job)` in the background. `done(result)` is called on the Tk
+    # thread when it returns, `failed(error)` when it raises (default: an error box).
+    # Returns the Job, or None (after telling the user) while a conflicting job runs.
+    def start(self, label, work, done, failed=None, writes=False):
+        running = self.conflict(writes)
+        if running is not None:
+            messagebox.showwarning("Busy", f"Please wait: {running.label} is still running.")
+            return None
+        job = Job(label, done, failed or (lambda error: messagebox.showerror(f"{label} Failed", str(error))), writes)
+        job.future = self._executor.submit(work, job)
+        self._jobs.append(job)
+        if len(self._jobs) == 1:
+            self.root.after(POLL_MS, self._poll)
+        self._show()
+        return job
+
+    # Function to ask every running job to stop at its next progress report
+    def cancel(self):
+        for job in self._jobs:
+            job.cancel()
+        if self._jobs:
+            self.status_label.config(text="Cancelling...")
+
+    # Function to cancel the running jobs and wait for the workers (e.g. on exit)
+    def shutdown(self):
+        for job in self._jobs:
+            job.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    # Function to hand finished jobs to their callbacks and refresh the status bar
+    def _poll(self):
+        for job in [job for job in self._jobs if job.future.done()]:
+            self._jobs.remove(job)
+            self._finish(job)
+        self._show()
+        if self._jobs:
+            self.root.after(POLL_MS, self._poll)
+
+    def _finish(self, job):
+        try:
+            result = job.future.result()
+        except (JobCancelled, concurrent.futures.CancelledError):
+            return
+        except Exception as error:
+            job.failed(error)
+            return
+        job.done(result)
+
+    # Function to show the first running job's progress, or "Ready" when idle
+    def _show(self):
+        if not self._jobs:
+            self._set_indeterminate(False)
+            self.progressbar["value"] = 0
+            self.status_label.config(text="Ready")
+            self.cancel_button.config(state=tk.DISABLED)
+            return
+        job = self._jobs[0]
+        text = job.text if len(self._jobs) == 1 else f"{job.text} (+{len(self._jobs) - 1} more)"
+        self.status_label.config(text="Cancelling..." if job.cancelled else text)
+        self._set_indeterminate(job.fraction is None)
+        if job.fraction is not None:
+            self.progressbar["value"] = job.fraction * 100
+        self.cancel_button.config(state=tk.NORMAL)
+
+    def _set_indeterminate(self, indeterminate):
+        if indeterminate == self._indeterminate:
+            return
+        self._indeterminate = indeterminate
+        self.progressbar.config(mode="indeterminate" if indeterminate else "determinate")
+        if indeterminate:
+            self.progressbar.start()
+        else:
+            self.progressbar.stop()
@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-from functools import reduce
+from inventory import ProductStore, SNAPSHOT_PATH, cached_view, load_csv, load_snapshot, operations, save_csv, save_snapshot, search_products
+from inventory.auth import check_credentials
+from product_table import render_product_table
 
 # Dummy user credentials (in a real application, you'd use a database)
 USER_CREDENTIALS = {
@@ -8,62 +9,103 @@ USER_CREDENTIALS = {
     "customer": {"password": "buy123", "role": "customer"}
 }
 
-# Global product dictionary to store product information
+# Global product store (see inventory/product_store.py) holding product information
 if 'products' not in st.session_state:
-    st.session_state.products = {}
+    st.session_state.products = ProductStore()
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
+if 'cart' not in st.session_state:
+    st.session_state.cart = {}
 if 'role' not in st.session_state:
     st.session_state.role = None
 
 # Function to handle product input
 def input_products(product_name, price, quantity):
-    if product_name and price > 0 and quantity > 0:
-        st.session_state.products[product_name] = {'price': price, 'quantity': quantity}
-        st.success(f"Product '{product_name}' added successfully!")
-        update_product_list()
+    try:
+        product_name = operations.add_product(st.session_state.products, product_name, price, quantity)
+    except ValueError as error:
+        st.error(str(error))
     else:
-        st.error("Please fill all fields with valid data.")
+        st.success(f"Product '{product_name}' added successfully!")
 
-# Function to update the product list displayed in the GUI
+# Function to render the product list as one paginated table (only the visible page is sent)
 def update_product_list():
-    if st.session_state.products:
-        st.write("**Product List:**")
-        for product, info in st.session_state.products.items():
-            st.write(f"{product}: Price = {info['price']}, Quantity = {info['quantity']}")
-    else:
-        st.write("No products available.")
+    render_product_table(st.session_state.products)
 
 # Function to handle product selection and purchase
-def select_product(selected_product):
-    if selected_product and st.session_state.products[selected_product]['quantity'] > 0:
-        st.session_state.products[selected_product]['quantity'] -= 1
+def select_product(selected_product, quantity=1):
+    try:
+        purchased = operations.purchase(st.session_state.products, selected_product, quantity)
+    except ValueError as error:
+        st.error(str(error))
+        return
+    if purchased:
         st.success(f"Thank you for purchasing {selected_product}.")
-        update_product_list()
-    elif selected_product:
+    else:
         st.error(f"{selected_product} is out of stock.")
+
+# Function to add units of a product to the customer's cart
+def add_to_cart(selected_product, quantity):
+    try:
+        operations.add_to_cart(st.session_state.cart, selected_product, quantity)
+    except ValueError as error:
+        st.error(str(error))
     else:
-        st.error("Please select a product.")
+        st.success(f"Added {quantity} x {selected_product} to your cart.")
+
+# Function to buy everything in the cart in one all-or-nothing step
+def checkout():
+    units = sum(st.session_state.cart.values())
+    try:
+        failed = operations.checkout(st.session_state.products, st.session_state.cart)
+    except ValueError as error:
+        st.error(str(error))
+        return
+    if failed:
+        st.error(f"Checkout failed, not enough stock for: {', '.join(failed)}. Nothing was purchased.")
+    else:
+        st.success(f"Thank you for purchasing {units} items.")
+
+# Function to show the cart with checkout/clear buttons
+def show_cart():
+    st.subheader("Your Cart")
+    checkout_col, clear_col = st.columns(2)
+    if checkout_col.button("Checkout"):
+        checkout()
+    if clear_col.button("Clear Cart"):
+        st.session_state.cart = {}
+
+    cart = st.session_state.cart
+    if not cart:
+        st.write("Your cart is empty.")
+        return
+    lines, total = operations.cart_lines(st.session_state.products, cart)
+    names, quantities, prices, line_totals = zip(*lines)
+    st.dataframe({"Product": names, "Quantity": quantities, "Price": prices, "Line Total": line_totals}, hide_index=True)
+    st.write(f"**Cart total: ${total:.2f}**")
 
 # Function to apply a discount to all products
 def apply_discount(discount_percentage):
-    if 0 <= discount_percentage <= 100:
-        discount_factor = 1 - discount_percentage / 100
-        for product in st.session_state.products.keys():
-            st.session_state.products[product]['price'] = round(st.session_state.products[product]['price'] * discount_factor, 2)
-        st.success(f"Discount of {discount_percentage}% applied to all products.")
-        update_product_list()
+    try:
+        operations.apply_discount(st.session_state.products, discount_percentage)
+    except ValueError as error:
+        st.error(str(error))
     else:
-        st.error("Please enter a valid discount percentage (0-100).")
+        st.success(f"Discount of {discount_percentage}% applied to all products.")
+
+# Function to end the discount and go back to the base prices
+def revert_discount():
+    operations.revert_discount(st.session_state.products)
+    st.success("Prices are back to their base prices.")
 
 # Function to calculate total stock value
 def calculate_total_stock_value():
-    total_value = reduce(lambda acc, product: acc + (product['price'] * product['quantity']), st.session_state.products.values(), 0)
+    total_value = st.session_state.products.total_stock_value()
     st.info(f"Total stock value: ${total_value:.2f}")
 
 # Function to filter out-of-stock products
 def filter_out_of_stock():
-    out_of_stock_products = [p for p in st.session_state.products if st.session_state.products[p]['quantity'] == 0]
+    out_of_stock_products = cached_view(st.session_state.products, "out_of_stock", ProductStore.out_of_stock)
     if out_of_stock_products:
         st.info(f"Out of stock products: {', '.join(out_of_stock_products)}")
     else:
@@ -72,25 +114,46 @@ def filter_out_of_stock():
 # Function to save products to a CSV file
 def save_to_csv():
     if st.session_state.products:
-        df = pd.DataFrame(st.session_state.products).T  # Convert to DataFrame and transpose for proper format
-        df.to_csv("products.csv")
+        save_csv(st.session_state.products)
         st.success("Products saved to 'products.csv'.")
     else:
         st.error("No products to save.")
 
-# Function to load products from a CSV file
+# Function to load products from a CSV file (streamed in chunks, gzip accepted)
 def load_from_csv():
+    progress_bar = st.progress(0.0, text="Loading products...")
     try:
-        df = pd.read_csv("products.csv", index_col=0)
-        st.session_state.products = df.T.to_dict()  # Convert DataFrame back to dictionary
+        result = load_csv("products.csv", progress=lambda fraction, rows: progress_bar.progress(fraction, text=f"Loaded {rows} products..."))
+        st.session_state.products = result.store
         st.success("Products loaded from 'products.csv'.")
-        update_product_list()
+        if result.rows_rejected:
+            st.warning(f"Skipped {result.rows_rejected} invalid rows.")
     except FileNotFoundError:
         st.error("'products.csv' not found.")
+    except ValueError as error:
+        st.error(f"Could not load 'products.csv': {error}")
+    finally:
+        progress_bar.empty()
+
+# Function to save products to a binary snapshot (keeps dtypes, memory-mapped on load)
+def save_snapshot_file():
+    if st.session_state.products:
+        save_snapshot(st.session_state.products)
+        st.success(f"Products saved to '{SNAPSHOT_PATH}'.")
+    else:
+        st.error("No products to save.")
+
+# Function to load products from a binary snapshot
+def load_snapshot_file():
+    try:
+        st.session_state.products = load_snapshot()
+        st.success(f"Products loaded from '{SNAPSHOT_PATH}'.")
+    except FileNotFoundError:
+        st.error(f"'{SNAPSHOT_PATH}' not found.")
 
 # Login function
 def login(username, password, role):
-    if username in USER_CREDENTIALS and USER_CREDENTIALS[username]["password"] == password and USER_CREDENTIALS[username]["role"] == role:
+    if check_credentials(USER_CREDENTIALS, username, password, role):
         st.session_state.logged_in = True
         st.session_state.role = role
         st.success(f"Login successful! Role: {st.session_state.role.capitalize()}")
@@ -101,6 +164,7 @@ def login(username, password, role):
 def logout():
     st.session_state.logged_in = False
     st.session_state.role = None
+    st.session_state.cart = {}
     st.success("You have been logged out.")
 
 # Main Application
@@ -150,8 +214,11 @@ else:
             # Discount Section
             st.header("Apply Discount")
             discount_percentage = st.number_input("Discount Percentage", min_value=0, max_value=100, step=1)
-            if st.button("Apply Discount"):
+            apply_col, revert_col = st.columns(2)
+            if apply_col.button("Apply Discount"):
                 apply_discount(discount_percentage)
+            if revert_col.button("Revert Discount"):
+                revert_discount()
 
             # Stock Value Calculation Section
             if st.button("Calculate Total Stock Value"):
@@ -167,6 +234,10 @@ else:
                 save_to_csv()
             if st.button("Load from CSV"):
                 load_from_csv()
+            if st.button("Save Snapshot"):
+                save_snapshot_file()
+            if st.button("Load Snapshot"):
+                load_snapshot_file()
 
     elif st.session_state.role == "customer":
         page = st.sidebar.selectbox("Select Page", ["Purchase Products", "Reports"])
@@ -175,9 +246,22 @@ else:
             # Product Purchase Section
             st.header("Purchase Product")
             if st.session_state.products:
-                selected_product = st.selectbox("Select a Product to Purchase", list(st.session_state.products.keys()))
-                if st.button("Purchase"):
-                    select_product(selected_product)
+                # Only the best matches for the search go into the selectbox
+                search = st.text_input("Search products", key="purchase_search")
+                with st.form("cart_form"):
+                    selected_product = st.selectbox("Select a Product to Purchase", cached_view(st.session_state.products, "search", search_products, search))
+                    purchase_quantity = st.number_input("Quantity", min_value=1, step=1)
+                    add_col, buy_col = st.columns(2)
+                    add_button = add_col.form_submit_button("Add to Cart")
+                    buy_button = buy_col.form_submit_button("Buy Now")
+
+                if add_button:
+                    add_to_cart(selected_product, purchase_quantity)
+                if buy_button:
+                    select_product(selected_product, purchase_quantity)
+
+                # Cart Section
+                show_cart()
             else:
                 st.warning("No products available for purchase.")
 
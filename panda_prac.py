@@ -1,10 +1,29 @@
+# Per-phase startup timing, reported once the window is up (see inventory/startup.py)
+from inventory.startup import StartupTimer
+startup = StartupTimer("panda_prac")
+
 import tkinter as tk
 from tkinter import messagebox
-from functools import reduce
-import pandas as pd
-
-# Global product dictionary to store product information
-products = {}
+from inventory import SNAPSHOT_PATH, load_csv, load_snapshot, operations, save_csv, search_products
+from inventory.metrics import start_exporter, timed
+from inventory.product_journal import open_journaled_store
+from job_runner import JobRunner
+from product_tree import ProductTreeView
+
+startup.mark("imports")
+
+# Hot-path metrics, exported on METRICS_PORT / to METRICS_FILE when set (see inventory/metrics.py)
+start_exporter()
+
+# Global product store (see inventory/product_store.py) holding product information.
+# It is rebuilt from the last snapshot plus the mutation journal, and every change is
+# journaled, so nothing is lost between saves (see inventory/product_journal.py).
+products, journal = open_journaled_store()
+startup.mark("journal replay")
+# Number of search matches listed while a search is typed
+SEARCH_RESULTS = 100
+# Cart of product name -> units, bought all at once on checkout
+cart = {}
 
 # Function to handle product input
 def input_products():
@@ -16,12 +35,13 @@ def input_products():
         messagebox.showerror("Input Error", "Please enter valid price and quantity values.")
         return
 
-    if product_name and price > 0 and quantity > 0:
-        products[product_name] = {'price': price, 'quantity': quantity}
-        update_product_list()
-        clear_entries()
-    else:
-        messagebox.showerror("Input Error", "Please fill all fields with valid data.")
+    try:
+        operations.add_product(products, product_name, price, quantity)
+    except ValueError as error:
+        messagebox.showerror("Input Error", str(error))
+        return
+    update_product_list()
+    clear_entries()
 
 # Function to clear input fields after adding a product
 def clear_entries():
@@ -29,75 +49,173 @@ def clear_entries():
     product_price_entry.delete(0, tk.END)
     product_quantity_entry.delete(0, tk.END)
 
-# Function to update the product list displayed in the GUI
-def update_product_list():
-    product_listbox.delete(0, tk.END)
-    for product, info in products.items():
-        product_listbox.insert(tk.END, f"{product}: Price = {info['price']}, Quantity = {info['quantity']}")
+# Function to update the product list displayed in the GUI.
+# While a search is typed, only its best matches are listed (see inventory/product_search.py);
+# otherwise only the rows changed since the last update are redrawn (see product_tree.py).
+@timed("update_product_list")
+def update_product_list(event=None):
+    search = search_entry.get()
+    product_view.show(search_products(products, search, SEARCH_RESULTS) if search.strip() else None)
 
-# Function to handle product selection and purchase
+# Function to handle product selection: adds the chosen quantity to the cart
+@timed("select_product")
 def select_product():
-    selected = product_listbox.curselection()
-    if not selected:
+    product_name = product_view.selected()
+    if product_name is None:
         messagebox.showerror("Selection Error", "Please select a product.")
         return
+    try:
+        quantity = int(cart_quantity_entry.get() or 1)
+    except ValueError:
+        quantity = 0
+    if quantity <= 0:
+        messagebox.showerror("Input Error", "Please enter a valid quantity.")
+        return
 
-    product_name = product_listbox.get(selected).split(':')[0]
-    if products[product_name]['quantity'] > 0:
-        products[product_name]['quantity'] -= 1
-        messagebox.showinfo("Purchase Successful", f"Thank you for purchasing {product_name}.")
-        update_product_list()
-    else:
-        messagebox.showerror("Out of Stock", f"{product_name} is out of stock.")
+    operations.add_to_cart(cart, product_name, quantity)
+    update_cart()
+
+# Function to show the cart contents and total
+def update_cart():
+    cart_listbox.delete(0, tk.END)
+    lines, total = operations.cart_lines(products, cart)
+    for product_name, quantity, price, _ in lines:
+        cart_listbox.insert(tk.END, f"{product_name}: {quantity} x {price}")
+    cart_total_label.config(text=f"Cart total: ${total:.2f}")
+
+# Function to buy everything in the cart in one all-or-nothing step
+@timed("checkout")
+def checkout():
+    units = sum(cart.values())
+    try:
+        failed = operations.checkout(products, cart)
+    except ValueError as error:
+        messagebox.showerror("Checkout Error", str(error))
+        return
+    if failed:
+        messagebox.showerror("Out of Stock", f"Not enough stock for: {', '.join(failed)}. Nothing was purchased.")
+        return
+    update_cart()
+    update_product_list()
+    messagebox.showinfo("Purchase Successful", f"Thank you for purchasing {units} items.")
+
+# Function to empty the cart
+def clear_cart():
+    cart.clear()
+    update_cart()
 
-# Function to apply a discount to all products using map and lambda
+# Function to apply a vectorized discount to all products
+@timed("apply_discount")
 def apply_discount():
     try:
         discount_percentage = float(discount_entry.get())
-        if 0 <= discount_percentage <= 100:
-            discount_factor = 1 - discount_percentage / 100
-            for product in products.keys():
-                products[product]['price'] = round(products[product]['price'] * discount_factor, 2)
-            update_product_list()
-            messagebox.showinfo("Discount Applied", f"Discount of {discount_percentage}% applied to all products.")
-        else:
-            messagebox.showerror("Input Error", "Please enter a valid discount percentage (0-100).")
     except ValueError:
         messagebox.showerror("Input Error", "Please enter a valid number for the discount percentage.")
+        return
+    try:
+        operations.apply_discount(products, discount_percentage)
+    except ValueError as error:
+        messagebox.showerror("Input Error", str(error))
+        return
+    update_product_list()
+    messagebox.showinfo("Discount Applied", f"Discount of {discount_percentage}% applied to all products.")
+
+# Function to end the discount and go back to the base prices
+def revert_discount():
+    operations.revert_discount(products)
+    update_product_list()
 
-# Function to calculate total stock value using reduce and lambda
+# Function to calculate total stock value from the price and quantity columns
 def calculate_total_stock_value():
-    total_value = reduce(lambda acc, product: acc + (product['price'] * product['quantity']), products.values(), 0)
+    total_value = products.total_stock_value()
     messagebox.showinfo("Total Stock Value", f"Total stock value: ${total_value:.2f}")
 
-# Function to filter out-of-stock products using filter and lambda
+# Function to filter out-of-stock products, collected in the background (see job_runner.py)
 def filter_out_of_stock():
-    out_of_stock_products = list(filter(lambda p: products[p]['quantity'] == 0, products.keys()))
+    jobs.start("Out-of-stock report", lambda job: products.out_of_stock(), show_out_of_stock)
+
+# Function to show the out-of-stock report once it is ready
+def show_out_of_stock(out_of_stock_products):
     if out_of_stock_products:
         messagebox.showinfo("Out of Stock", f"Out of stock products: {', '.join(out_of_stock_products)}")
     else:
         messagebox.showinfo("All in Stock", "All products are in stock.")
 
-# Function to save products to a CSV file using pandas
+# Function to switch the app to a freshly loaded store (the journal is already attached)
+def use_products(store):
+    global products
+    products = store
+    product_view.attach(products)
+    update_product_list()
+
+# Function to report a failed load job
+def show_load_error(path, error):
+    if isinstance(error, FileNotFoundError):
+        messagebox.showerror("Load Error", f"'{path}' not found.")
+    else:
+        messagebox.showerror("Load Error", str(error))
+
+# Function to save products to a CSV file in the background, with progress per chunk
 def save_to_csv():
     if not products:
         messagebox.showerror("Save Error", "No products to save.")
         return
 
-    df = pd.DataFrame(products).T  # Convert to DataFrame and transpose for proper format
-    df.to_csv("products.csv")
-    messagebox.showinfo("Save Successful", "Products saved to 'products.csv'.")
-
-# Function to load products from a CSV file using pandas
+    jobs.start("Saving to CSV", save_csv_job,
+               lambda result: messagebox.showinfo("Save Successful", "Products saved to 'products.csv'."))
+
+# Background job: write products.csv chunk by chunk, reporting progress
+@timed("save_to_csv")
+def save_csv_job(job):
+    save_csv(products, progress=lambda fraction, rows: job.progress(fraction, f"Saved {rows} products..."))
+
+# Background job: stream products.csv into a new store and journal it from then on.
+# Cancelling stops the load before the journal switches, so nothing changes.
+@timed("load_from_csv")
+def load_csv_job(job):
+    result = load_csv("products.csv", progress=lambda fraction, rows: job.progress(fraction, f"Loaded {rows} products..."))
+    job.progress(None, "Saving snapshot of the loaded products...")
+    journal.attach(result.store)
+    return result
+
+# Function to show the products loaded by the CSV job
+def csv_loaded(result):
+    use_products(result.store)
+    message = "Products loaded from 'products.csv'."
+    if result.rows_rejected:
+        message += f" Skipped {result.rows_rejected} invalid rows."
+    messagebox.showinfo("Load Successful", message)
+
+# Function to load products from a CSV file (streamed in chunks, gzip accepted)
 def load_from_csv():
-    try:
-        df = pd.read_csv("products.csv", index_col=0)
-        global products
-        products = df.T.to_dict()  # Convert DataFrame back to dictionary
-        update_product_list()
-        messagebox.showinfo("Load Successful", "Products loaded from 'products.csv'.")
-    except FileNotFoundError:
-        messagebox.showerror("Load Error", "'products.csv' not found.")
+    jobs.start("Loading from CSV", load_csv_job, csv_loaded,
+               lambda error: show_load_error("products.csv", error), writes=True)
+
+# Function to save products to a binary snapshot (keeps dtypes, memory-mapped on load)
+def save_snapshot_file():
+    if not products:
+        messagebox.showerror("Save Error", "No products to save.")
+        return
+
+    jobs.start("Saving snapshot", lambda job: journal.compact(),
+               lambda result: messagebox.showinfo("Save Successful", f"Products saved to '{SNAPSHOT_PATH}'."))
+
+# Background job: open the snapshot and journal it from then on
+def load_snapshot_job(job):
+    store = load_snapshot()
+    job.progress(None, "Compacting the journal...")
+    journal.attach(store)
+    return store
+
+# Function to show the products loaded by the snapshot job
+def snapshot_loaded(store):
+    use_products(store)
+    messagebox.showinfo("Load Successful", f"Products loaded from '{SNAPSHOT_PATH}'.")
+
+# Function to load products from a binary snapshot
+def load_snapshot_file():
+    jobs.start("Loading snapshot", load_snapshot_job, snapshot_loaded,
+               lambda error: show_load_error(SNAPSHOT_PATH, error), writes=True)
 
 # Main window setup
 root = tk.Tk()
@@ -126,11 +244,39 @@ add_product_button.grid(row=3, column=0, columnspan=2, pady=10)
 product_list_frame = tk.Frame(root)
 product_list_frame.pack(padx=10, pady=10)
 
-product_listbox = tk.Listbox(product_list_frame, width=50, height=10)
-product_listbox.pack()
+search_frame = tk.Frame(product_list_frame)
+search_frame.pack(fill=tk.X)
+tk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+search_entry = tk.Entry(search_frame)
+search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+search_entry.bind("<KeyRelease>", update_product_list)
+
+product_view = ProductTreeView(product_list_frame, products)
+product_view.pack()
+
+# Cart Section
+cart_frame = tk.Frame(product_list_frame)
+cart_frame.pack(pady=10)
+
+tk.Label(cart_frame, text="Quantity:").grid(row=0, column=0, padx=5, pady=5)
+cart_quantity_entry = tk.Entry(cart_frame, width=6)
+cart_quantity_entry.insert(0, "1")
+cart_quantity_entry.grid(row=0, column=1, padx=5, pady=5)
 
-select_product_button = tk.Button(product_list_frame, text="Select Product", command=select_product)
-select_product_button.pack(pady=10)
+select_product_button = tk.Button(cart_frame, text="Add to Cart", command=select_product)
+select_product_button.grid(row=0, column=2, padx=5, pady=5)
+
+cart_listbox = tk.Listbox(cart_frame, width=50, height=5)
+cart_listbox.grid(row=1, column=0, columnspan=3, pady=5)
+
+cart_total_label = tk.Label(cart_frame, text="Cart total: $0.00")
+cart_total_label.grid(row=2, column=0, columnspan=3)
+
+checkout_button = tk.Button(cart_frame, text="Checkout", command=checkout)
+checkout_button.grid(row=3, column=0, padx=5, pady=5)
+
+clear_cart_button = tk.Button(cart_frame, text="Clear Cart", command=clear_cart)
+clear_cart_button.grid(row=3, column=1, padx=5, pady=5)
 
 # Discount Section
 discount_frame = tk.Frame(root)
@@ -141,7 +287,10 @@ discount_entry = tk.Entry(discount_frame)
 discount_entry.grid(row=0, column=1, padx=5, pady=5)
 
 discount_button = tk.Button(discount_frame, text="Apply Discount", command=apply_discount)
-discount_button.grid(row=1, column=0, columnspan=2, pady=10)
+discount_button.grid(row=1, column=0, pady=10)
+
+revert_discount_button = tk.Button(discount_frame, text="Revert Discount", command=revert_discount)
+revert_discount_button.grid(row=1, column=1, pady=10)
 
 # Stock Value and Filter Section
 stock_frame = tk.Frame(root)
@@ -163,5 +312,29 @@ save_button.grid(row=0, column=0, padx=5, pady=5)
 load_button = tk.Button(save_load_frame, text="Load from CSV", command=load_from_csv)
 load_button.grid(row=0, column=1, padx=5, pady=5)
 
+save_snapshot_button = tk.Button(save_load_frame, text="Save Snapshot", command=save_snapshot_file)
+save_snapshot_button.grid(row=1, column=0, padx=5, pady=5)
+
+load_snapshot_button = tk.Button(save_load_frame, text="Load Snapshot", command=load_snapshot_file)
+load_snapshot_button.grid(row=1, column=1, padx=5, pady=5)
+
+# Background Job Section: status, progress bar and Cancel button
+jobs = JobRunner(root)
+jobs.pack(fill=tk.X, padx=10, pady=5)
+
+startup.mark("widgets")
+
+# Function to end the startup timing once the event loop has drawn the window
+def finish_startup():
+    startup.mark("first draw")
+    startup.finish()
+
+# Show the restored products, then report the startup timing once the window is drawn
+update_product_list()
+startup.mark("product list")
+root.after_idle(finish_startup)
+
 # Start the GUI event loop
 root.mainloop()
+jobs.shutdown()
+journal.close()
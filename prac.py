@@ -1,8 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox
+from inventory import ProductStore, operations, search_products
+from product_tree import ProductTreeView
 
-# Global product dictionary to store product information
-products = {}
+# Global product store (see inventory/product_store.py) holding product information
+products = ProductStore()
+# Number of search matches listed while a search is typed
+SEARCH_RESULTS = 100
 
 # Function to handle product input
 def input_products():
@@ -14,12 +18,13 @@ def input_products():
         messagebox.showerror("Input Error", "Please enter valid price and quantity values.")
         return
 
-    if product_name and price > 0 and quantity > 0:
-        products[product_name] = {'price': price, 'quantity': quantity}
-        update_product_list()
-        clear_entries()
-    else:
-        messagebox.showerror("Input Error", "Please fill all fields with valid data.")
+    try:
+        operations.add_product(products, product_name, price, quantity)
+    except ValueError as error:
+        messagebox.showerror("Input Error", str(error))
+        return
+    update_product_list()
+    clear_entries()
 
 # Function to clear input fields after adding a product
 def clear_entries():
@@ -27,22 +32,21 @@ def clear_entries():
     product_price_entry.delete(0, tk.END)
     product_quantity_entry.delete(0, tk.END)
 
-# Function to update the product list displayed in the GUI
-def update_product_list():
-    product_listbox.delete(0, tk.END)
-    for product, info in products.items():
-        product_listbox.insert(tk.END, f"{product}: Price = {info['price']}, Quantity = {info['quantity']}")
+# Function to update the product list displayed in the GUI.
+# While a search is typed, only its best matches are listed (see inventory/product_search.py);
+# otherwise only the rows changed since the last update are redrawn (see product_tree.py).
+def update_product_list(event=None):
+    search = search_entry.get()
+    product_view.show(search_products(products, search, SEARCH_RESULTS) if search.strip() else None)
 
 # Function to handle product selection and purchase
 def select_product():
-    selected = product_listbox.curselection()
-    if not selected:
+    product_name = product_view.selected()
+    if product_name is None:
         messagebox.showerror("Selection Error", "Please select a product.")
         return
 
-    product_name = product_listbox.get(selected).split(':')[0]
-    if products[product_name]['quantity'] > 0:
-        products[product_name]['quantity'] -= 1
+    if operations.purchase(products, product_name):
         messagebox.showinfo("Purchase Successful", f"Thank you for purchasing {product_name}.")
         update_product_list()
     else:
@@ -75,8 +79,15 @@ add_product_button.grid(row=3, column=0, columnspan=2, pady=10)
 product_list_frame = tk.Frame(root)
 product_list_frame.pack(padx=10, pady=10)
 
-product_listbox = tk.Listbox(product_list_frame, width=50, height=10)
-product_listbox.pack()
+search_frame = tk.Frame(product_list_frame)
+search_frame.pack(fill=tk.X)
+tk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+search_entry = tk.Entry(search_frame)
+search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+search_entry.bind("<KeyRelease>", update_product_list)
+
+product_view = ProductTreeView(product_list_frame, products)
+product_view.pack()
 
 select_product_button = tk.Button(product_list_frame, text="Select Product", command=select_product)
 select_product_button.pack(pady=10)
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+from inventory import cached_view
+
+# Columns the product table can be sorted by ("Added" keeps insertion order)
+SORT_OPTIONS = ["Added", "Name", "Price", "Quantity"]
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+# Function to pick the matching rows of a ProductStore, filtered and sorted.
+# Filtering and sorting happen on the server, returning row numbers only, so
+# just the visible page is ever turned into table cells.
+def product_rows(store, search="", sort_by="Added", descending=False):
+    names = store.names
+    if search:
+        needle = search.lower()
+        rows = np.fromiter((row for row, name in enumerate(names) if needle in name.lower()), dtype=np.int64)
+    else:
+        rows = np.arange(len(names), dtype=np.int64)
+
+    if sort_by == "Name":
+        rows = np.asarray(sorted(rows.tolist(), key=names.__getitem__), dtype=np.int64)
+    elif sort_by == "Price":
+        rows = rows[np.argsort(store.prices[rows], kind="stable")]
+    elif sort_by == "Quantity":
+        rows = rows[np.argsort(store.quantities[rows], kind="stable")]
+    if descending:
+        rows = rows[::-1]
+    return rows
+
+
+# Function to slice one page out of the matching rows as (names, prices, quantities)
+def product_page(store, rows, page=1, page_size=PAGE_SIZES[0]):
+    start = (page - 1) * page_size
+    visible = rows[start:start + page_size]
+    names = [store.names[row] for row in visible.tolist()]
+    return names, store.prices[visible].tolist(), store.quantities[visible].tolist()
+
+
+# Function to render the product list as a single paginated, sortable, filterable table
+def render_product_table(store, key="product_table"):
+    if not store:
+        st.write("No products available.")
+        return
+
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    search = search_col.text_input("Filter by name", key=f"{key}_search")
+    sort_by = sort_col.selectbox("Sort by", SORT_OPTIONS, key=f"{key}_sort")
+    descending = order_col.checkbox("Descending", key=f"{key}_desc")
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_size")
+
+    # Filtering and sorting are only redone once the catalog or the options change
+    rows = cached_view(store, "product_rows", product_rows, search, sort_by, descending)
+
+    # Clamp the page before rendering the page input, since filtering can shrink the result
+    page_key = f"{key}_page"
+    page_count = max(1, math.ceil(len(rows) / page_size))
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key=page_key)
+
+    names, prices, quantities = product_page(store, rows, int(page), page_size)
+    st.dataframe({"Product": names, "Price": prices, "Quantity": quantities}, hide_index=True)
+    st.caption(f"Showing {len(names)} of {len(rows)} matching products ({len(store)} total).")
@@ -0,0 +1,144 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+# Rows inserted into the tree at a time; the next page is loaded as the list is scrolled
+PAGE_ROWS = 200
+# Load the next page once the bottom of the view passes this fraction of the loaded rows
+LOAD_AHEAD = 0.9
+
+
+# Tkinter product list: a ttk.Treeview of (product, price, quantity) rows kept in step
+# with a ProductStore. The view subscribes to the store and redraws only the rows a
+# mutation touched, so one purchase updates one line; reshaping events (extend, remove,
+# clear) rebuild it. It keeps a product <-> tree item index, so a selection maps straight
+# to a product name. Rows are inserted a page at a time as the list is scrolled, so a
+# 1M product catalog costs one page of tree items.
+# The listener only records what changed; the tree is updated by refresh() on the Tk
+# thread (scheduled automatically for mutations made there), so stores changed from
+# background threads never touch the widget directly.
+class ProductTreeView:
+    def __init__(self, parent, store, height=10, page_rows=PAGE_ROWS):
+        self.page_rows = page_rows
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=("price", "quantity"), height=height, selectmode="browse")
+        self.tree.heading("#0", text="Product")
+        self.tree.heading("price", text="Price")
+        self.tree.heading("quantity", text="Quantity")
+        self.tree.column("#0", width=240)
+        self.tree.column("price", width=90, anchor=tk.E)
+        self.tree.column("quantity", width=80, anchor=tk.E)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.store = None
+        # Names listed: None for the whole catalog in row order, else e.g. search results
+        self._filter = None
+        self._loaded = 0
+        self._items = {}
+        self._names = {}
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._reprice = False
+        self._stale = True
+        self._scheduled = False
+        self.attach(store)
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def grid(self, **options):
+        self.frame.grid(**options)
+
+    # Function to show another store (e.g. after loading a file built a new one)
+    def attach(self, store):
+        if self.store is not None:
+            self.store.unsubscribe(self._listener)
+        self.store = store
+        store.subscribe(self._listener)
+        self._mark_stale()
+
+    # Function to list only `names` (e.g. search results), or the whole catalog for None,
+    # and apply any pending changes
+    def show(self, names=None):
+        if names != self._filter:
+            self._filter = names
+            self._mark_stale()
+        self.refresh()
+
+    # Function to get the selected product's name, or None
+    def selected(self):
+        selection = self.tree.selection()
+        return self._names.get(selection[0]) if selection else None
+
+    # Store listener: record the change and schedule a refresh when on the Tk thread
+    def _listener(self, event, *args):
+        with self._lock:
+            if event in ("purchase", "add", "sync"):
+                self._dirty.add(args[0])
+            elif event == "discount":
+                self._reprice = True
+            else:
+                self._stale = True
+            schedule = not self._scheduled and threading.current_thread() is threading.main_thread()
+            self._scheduled = self._scheduled or schedule
+        if schedule:
+            self.tree.after_idle(self.refresh)
+
+    def _mark_stale(self):
+        with self._lock:
+            self._stale = True
+
+    # Function to apply the recorded changes: rebuild after reshaping events, otherwise
+    # rewrite just the changed rows that are loaded
+    def refresh(self):
+        with self._lock:
+            stale, reprice, dirty = self._stale, self._reprice, self._dirty
+            self._stale = self._reprice = self._scheduled = False
+            self._dirty = set()
+        if stale:
+            self._rebuild()
+            return
+        for name in (list(self._items) if reprice else dirty):
+            item = self._items.get(name)
+            if item is not None and name in self.store:
+                self.tree.item(item, values=self.store.get(name))
+        # New products are appended to the catalog; list them if the end is showing
+        self._load_more()
+
+    def _model(self):
+        return self.store.names if self._filter is None else self._filter
+
+    # Function to drop every tree item and load the first pages again
+    def _rebuild(self):
+        rows = max(self._loaded, self.page_rows)
+        self.tree.delete(*self.tree.get_children())
+        self._items.clear()
+        self._names.clear()
+        self._loaded = 0
+        self._load_rows(rows)
+
+    # Function to insert the next `count` products of the model
+    def _load_rows(self, count):
+        model = self._model()
+        end = min(self._loaded + count, len(model))
+        for name in model[self._loaded:end]:
+            if name in self._items or name not in self.store:
+                continue
+            item = self.tree.insert("", tk.END, text=name, values=self.store.get(name))
+            self._items[name] = item
+            self._names[item] = name
+        self._loaded = end
+
+    # Function to load another page when the first page isn't full or the end is in view
+    def _load_more(self):
+        if self._loaded < len(self._model()) and (self._loaded < self.page_rows or self.tree.yview()[1] >= LOAD_AHEAD):
+            self._load_rows(self.page_rows)
+
+    # Scrollbar callback: move the scrollbar, then load ahead once idle
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= LOAD_AHEAD and self._loaded < len(self._model()):
+            self.tree.after_idle(self._load_more)
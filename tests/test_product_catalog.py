@@ -0,0 +1,59 @@
+# Write-behind queue for the products collection.
+import mongomock
+import pytest
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from inventory import ProductStore
+from inventory.product_catalog import WriteBehindQueue
+from inventory.purchase_engine import purchase_in_mongo
+
+
+class FailingCollection:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.written = []
+
+    def bulk_write(self, batch, ordered=True):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.written.extend(batch)
+
+
+def _queue(collection):
+    queue = WriteBehindQueue(collection, max_batch=2, max_delay=3600)
+    queue.enqueue([UpdateOne({"name": f"item {index}"}, {"$inc": {"quantity": 1}}) for index in range(5)])
+    return queue
+
+
+def test_write_concern_error_keeps_the_rest_of_the_queue():
+    error = BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"errmsg": "waiting for replication timed out"}]})
+    collection = FailingCollection(error)
+    queue = _queue(collection)
+    assert queue.flush() is False
+    # The first batch was applied; the other three operations wait for the next flush
+    assert len(queue) == 3
+    assert queue.flush() is True
+    assert len(collection.written) == 3
+    queue.close()
+
+
+def test_unexpected_error_requeues_everything_unwritten():
+    collection = FailingCollection(ValueError("boom"))
+    queue = _queue(collection)
+    with pytest.raises(ValueError):
+        queue.flush()
+    assert len(queue) == 5
+    queue.close()
+    assert len(collection.written) == 5
+
+
+def test_write_through_add_does_not_undo_a_later_mongo_purchase():
+    collection = mongomock.MongoClient().db.products
+    store = ProductStore()
+    queue = WriteBehindQueue(collection, max_delay=3600, write_through=True)
+    store.subscribe(queue)
+    store.add("lamp", 10.0, 5)
+    assert purchase_in_mongo(collection, "lamp", 2) == (10.0, 3)
+    queue.close()
+    assert collection.find_one({"name": "lamp"})["quantity"] == 3
@@ -0,0 +1,30 @@
+# Products CSV loading: bad headers are reported, bad rows are skipped.
+import gzip
+
+import pytest
+
+from inventory import load_csv
+from inventory.file_reports import report_file
+
+
+def test_missing_columns_are_reported(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text(",price\nlamp,1.0\n")
+    with pytest.raises(ValueError, match="quantity"):
+        load_csv(str(path))
+    with pytest.raises(ValueError, match="quantity"):
+        report_file(str(path), workers=1)
+    gzipped = tmp_path / "products.csv.gz"
+    gzipped.write_bytes(gzip.compress(path.read_bytes()))
+    with pytest.raises(ValueError, match="quantity"):
+        report_file(str(gzipped), workers=1)
+
+
+def test_quantities_beyond_int64_are_invalid_rows(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text(",price,quantity\nlamp,1.0,3\nsofa,2.0,1e19\nchair,3.0,9223372036854775808\n")
+    result = load_csv(str(path))
+    assert (result.rows_loaded, result.rows_rejected) == (1, 2)
+    assert list(result.store.items()) == [("lamp", 1.0, 3)]
+    report = report_file(str(path), workers=1)
+    assert (report.rows, report.rows_rejected, report.total_units) == (1, 2, 3)
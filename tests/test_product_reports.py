@@ -0,0 +1,59 @@
+# The report index merges changed rows into its sorted order instead of re-sorting;
+# after any mix of mutations it must agree with a fresh sort of the store.
+import random
+
+import numpy as np
+import pytest
+
+from inventory import ProductStore, report_index
+from inventory.product_reports import METRICS
+
+
+def expected_top(store, metric, n):
+    prices, quantities = store.prices, store.quantities
+    column = {"price": prices, "quantity": quantities, "value": prices * quantities}[metric]
+    return sorted(column.tolist(), reverse=True)[:n]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_matches_a_fresh_sort_after_mutations(seed):
+    rng = random.Random(seed)
+    store = ProductStore.from_columns([f"p{i}" for i in range(200)],
+                                      [rng.uniform(1, 100) for _ in range(200)],
+                                      [rng.randrange(0, 50) for _ in range(200)])
+    store.set_group([f"p{i}" for i in range(0, 200, 3)], "sale")
+    index = report_index(store)
+    index.top("value", 1)
+    added = 0
+    for _ in range(300):
+        action = rng.choice(["purchase", "add", "readd", "extend", "group", "discount", "remove"])
+        name = rng.choice(store.names)
+        if action == "purchase" and store.quantity(name):
+            store.purchase(name, 1)
+        elif action == "add":
+            store.add(f"new{added}", rng.uniform(1, 100), rng.randrange(0, 50))
+            added += 1
+        elif action == "readd":
+            store.add(name, rng.uniform(1, 100), rng.randrange(0, 50))
+        elif action == "extend":
+            names = [f"new{added + i}" for i in range(5)] + [name]
+            added += 5
+            store.extend(names, np.random.default_rng(seed).uniform(1, 100, 6), np.arange(6))
+        elif action == "group":
+            store.set_group(rng.sample(store.names, 3), rng.choice([None, "sale"]))
+        elif action == "discount":
+            store.set_discount(rng.choice([0.5, 0.8, 1.0]), "sale")
+        elif action == "remove" and len(store) > 50:
+            store.remove(name)
+        metric = rng.choice(METRICS)
+        assert [product[{"price": 1, "quantity": 2}.get(metric, 1)] if metric != "value" else product[1] * product[2]
+                for product in index.top(metric, 10)] == pytest.approx(expected_top(store, metric, 10))
+
+
+def test_adding_one_product_does_not_rebuild():
+    store = ProductStore.from_columns(["a", "b", "c"], [3.0, 1.0, 2.0], [1, 1, 1])
+    index = report_index(store)
+    index.top("price", 1)
+    store.add("d", 2.5, 1)
+    assert "price" not in index._stale
+    assert [name for name, _, _ in index.top("price", 4)] == ["a", "d", "c", "b"]
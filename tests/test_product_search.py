@@ -0,0 +1,47 @@
+# Typo-tolerant search on a catalog large enough that candidates must come from the
+# trigram index rather than from the start of the name list.
+import pytest
+
+from benchmarks.synthetic import product_names
+from inventory.product_search import TRIGRAM_CHANGES, ProductSearchIndex
+
+NAMES = product_names(100_000)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ProductSearchIndex(NAMES)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("keybaord", "Keyboard"),
+    ("wireles mouse", "Wireless Mouse"),
+])
+def test_typos_match_at_scale(index, query, expected):
+    matches = index.search(query)
+    assert len(matches) == 20
+    assert all(expected in name for name in matches)
+
+
+def test_typo_finds_the_one_product(index):
+    target = NAMES[50000]
+    typo = target.lower().replace("a", "e", 1).replace("o", "0", 1)
+    assert typo != target.lower()
+    assert index.search(typo)[0] == target
+
+
+def test_no_match(index):
+    assert index.search("qqqxzj") == []
+
+
+def test_fuzzy_follows_added_and_removed_names():
+    index = ProductSearchIndex(NAMES[:1000])
+    assert "Zebra Lamp" not in index.search("zebra lamp")
+    index("add", "Zebra Lamp", 1.0, 1)
+    assert index.search("zebre lamp")[0] == "Zebra Lamp"
+    index("remove", "Zebra Lamp", 0)
+    assert "Zebra Lamp" not in index.search("zebre lamp")
+    for number in range(TRIGRAM_CHANGES + 1):
+        index("add", f"Zebra Lamp {number}", 1.0, 1)
+    assert index._trigrams is None
+    assert index.search("zebre lamp 77")[0] == "Zebra Lamp 77"
@@ -0,0 +1,92 @@
+# Snapshot versions: every save writes a new version directory and switches the pointer
+# file, so a store memory-mapping the previous version is never written over.
+import json
+import os
+
+import numpy as np
+import pytest
+
+from inventory import ProductStore, load_snapshot, save_snapshot
+from inventory import product_journal
+from inventory.product_journal import open_journaled_store
+from inventory.product_snapshot import POINTER_FILE, read_snapshot_meta
+
+
+def test_saving_over_a_loaded_snapshot_writes_a_new_version(tmp_path):
+    path = str(tmp_path / "products.snapshot")
+    save_snapshot(ProductStore.from_columns(["a", "b"], [1.0, 2.0], [3, 4]), path)
+    store = load_snapshot(path)
+    store.purchase("a", 1)
+    save_snapshot(store, path)
+    save_snapshot(store, path)
+    assert sorted(os.listdir(path)) == [POINTER_FILE, "v000002", "v000003"]
+    assert list(load_snapshot(path).items()) == [("a", 1.0, 2), ("b", 2.0, 4)]
+
+
+def test_snapshots_without_versions_still_load(tmp_path):
+    path = tmp_path / "products.snapshot"
+    path.mkdir()
+    np.save(path / "names.npy", np.frombuffer("a\x00b".encode("utf-8"), dtype=np.uint8))
+    np.save(path / "price.npy", np.array([1.0, 2.0]))
+    np.save(path / "quantity.npy", np.array([3, 4]))
+    (path / "meta.json").write_text(json.dumps({"version": 1, "count": 2, "journal_seq": 7}))
+    assert read_snapshot_meta(str(path))["journal_seq"] == 7
+    store = load_snapshot(str(path))
+    save_snapshot(store, str(path))
+    assert sorted(os.listdir(path)) == [POINTER_FILE, "v000001"]
+    assert list(load_snapshot(str(path)).items()) == [("a", 1.0, 3), ("b", 2.0, 4)]
+
+
+def test_compaction_over_a_mapped_snapshot(tmp_path):
+    snapshot_path, journal_path = str(tmp_path / "products.snapshot"), str(tmp_path / "products.journal")
+    store, journal = open_journaled_store(snapshot_path, journal_path)
+    store.add("x", 1.0, 5)
+    journal.compact()
+    journal.close()
+
+    store, journal = open_journaled_store(snapshot_path, journal_path)
+    for _ in range(3):
+        store.purchase("x", 1)
+        journal.compact()
+    store.add("y", 2.0, 1)
+    journal.close()
+    assert os.path.getsize(journal_path) > 0
+
+    store, journal = open_journaled_store(snapshot_path, journal_path)
+    journal.close()
+    assert list(store.items()) == [("x", 1.0, 2), ("y", 2.0, 1)]
+
+
+def test_names_with_nul_are_rejected_even_alone(tmp_path):
+    path = str(tmp_path / "products.snapshot")
+    with pytest.raises(ValueError):
+        save_snapshot(ProductStore.from_columns(["a\x00b"], [1.0], [1]), path)
+    save_snapshot(ProductStore(), path)
+    assert list(load_snapshot(path).items()) == []
+
+
+def test_records_of_an_unfinished_compaction_are_kept(tmp_path, monkeypatch):
+    snapshot_path, journal_path = str(tmp_path / "products.snapshot"), str(tmp_path / "products.journal")
+    store, journal = open_journaled_store(snapshot_path, journal_path)
+    store.add("x", 1.0, 5)
+
+    def disk_full(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(product_journal, "write_snapshot", disk_full)
+        for _ in range(2):
+            store.purchase("x", 1)
+            with pytest.raises(OSError):
+                journal.compact()
+    store.add("y", 2.0, 1)
+    journal.close()
+
+    store, journal = open_journaled_store(snapshot_path, journal_path)
+    assert list(store.items()) == [("x", 1.0, 3), ("y", 2.0, 1)]
+    journal.compact()
+    journal.close()
+    assert not os.path.exists(journal_path + product_journal.OLD_SUFFIX)
+    store, journal = open_journaled_store(snapshot_path, journal_path)
+    journal.close()
+    assert list(store.items()) == [("x", 1.0, 3), ("y", 2.0, 1)]
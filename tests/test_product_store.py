@@ -0,0 +1,21 @@
+# Whole-catalog replacement keeps what a discount needs to be reverted.
+from inventory import ProductStore
+
+
+def test_replace_with_keeps_base_prices_groups_and_discounts():
+    source = ProductStore.from_columns(["a", "b", "c"], [10.0, 20.0, 30.0], [1, 2, 3])
+    source.set_group(["a", "c"], "toys")
+    source.apply_discount(50, "toys")
+    source.apply_discount(10)
+    events = []
+    store = ProductStore.from_columns(["old"], [1.0], [1])
+    store.apply_discount(20)
+    store.subscribe(lambda event, *args: events.append(event))
+
+    store.replace_with(source)
+    assert list(store.items()) == list(source.items())
+    assert store.base_prices.tolist() == [10.0, 20.0, 30.0]
+    assert events == ["clear", "extend", "group", "discount", "discount"]
+    store.revert_discount("toys")
+    store.revert_discount()
+    assert store.prices.tolist() == [10.0, 20.0, 30.0]
@@ -0,0 +1,133 @@
+# Checkout in MongoDB. mongomock has no sessions, so the transaction path runs against
+# a collection whose client hands out a fake session: start_transaction() saves the
+# documents and abort_transaction() puts them back.
+import contextlib
+
+import mongomock
+import pytest
+from pymongo.errors import OperationFailure
+
+from inventory import ProductStore, sales_history
+from inventory.purchase_engine import PurchaseEngine, purchase_many_in_mongo
+
+
+class FakeSession:
+    def __init__(self, collection):
+        self.collection = collection
+        self.saved = None
+        self.aborted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @contextlib.contextmanager
+    def start_transaction(self):
+        self.saved = list(self.collection.find({}))
+        yield
+
+    def abort_transaction(self):
+        self.aborted = True
+        self.collection.delete_many({})
+        if self.saved:
+            self.collection.insert_many(self.saved)
+
+    # No retries here: an error from the callback aborts and propagates, as it does
+    # once pymongo's retries run out
+    def with_transaction(self, callback):
+        with self.start_transaction():
+            try:
+                return callback(self)
+            except Exception:
+                self.abort_transaction()
+                raise
+
+
+class FakeClient:
+    def __init__(self, collection):
+        self.collection = collection
+        self.sessions = []
+
+    def start_session(self):
+        session = FakeSession(self.collection)
+        self.sessions.append(session)
+        return session
+
+
+class FakeDatabase:
+    def __init__(self, client):
+        self.client = client
+
+
+# mongomock collection whose `database.client` supports transactions; mongomock
+# itself rejects session arguments, so they are dropped here
+class TransactionalCollection:
+    def __init__(self, collection):
+        self._collection = collection
+        self.database = FakeDatabase(FakeClient(collection))
+
+    def find(self, *args, session=None, **kwargs):
+        return self._collection.find(*args, **kwargs)
+
+    def bulk_write(self, *args, session=None, **kwargs):
+        return self._collection.bulk_write(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+@pytest.fixture
+def collection():
+    products = mongomock.MongoClient().db.products
+    products.insert_many([{"name": "a", "price": 2.0, "quantity": 3},
+                          {"name": "b", "price": 5.0, "quantity": 1}])
+    return TransactionalCollection(products)
+
+
+def stock(collection):
+    return {product["name"]: product["quantity"] for product in collection.find({})}
+
+
+def test_checkout_reports_only_the_lines_short_of_stock(collection):
+    products, failed = purchase_many_in_mongo(collection, {"a": 2, "b": 5})
+    assert (products, failed) == ({}, ["b"])
+    assert stock(collection) == {"a": 3, "b": 1}
+    assert collection.database.client.sessions[0].aborted
+
+
+def test_checkout_of_the_exact_remaining_stock_succeeds(collection):
+    products, failed = purchase_many_in_mongo(collection, {"a": 3, "b": 1})
+    assert (products, failed) == ({"a": (2.0, 0), "b": (5.0, 0)}, [])
+    assert stock(collection) == {"a": 0, "b": 0}
+    assert not collection.database.client.sessions[0].aborted
+
+
+def test_checkout_reports_unknown_products(collection):
+    assert purchase_many_in_mongo(collection, {"a": 1, "c": 1}) == ({}, ["c"])
+    assert stock(collection) == {"a": 3, "b": 1}
+
+
+def test_checkout_without_transactions_compensates(collection):
+    plain = collection._collection
+    assert purchase_many_in_mongo(plain, {"a": 2, "b": 5}) == ({}, ["b"])
+    assert stock(plain) == {"a": 3, "b": 1}
+
+
+def test_engine_syncs_the_store_and_records_sales(collection):
+    store = ProductStore.from_columns(["a", "b"], [2.0, 5.0], [3, 1])
+    engine = PurchaseEngine(store, collection)
+    assert engine.purchase_many({"a": 2, "b": 5}) == ["b"]
+    assert engine.purchase_many({"a": 2, "b": 1}) == []
+    assert (store.quantity("a"), store.quantity("b")) == (1, 0)
+    assert sales_history(store).units_sold(60)[0].tolist() == [2, 1]
+
+
+def test_checkout_fails_cleanly_when_write_conflicts_outlast_the_retries(collection):
+    def conflict(*args, **kwargs):
+        raise OperationFailure("Write conflict", 112, {"errorLabels": ["TransientTransactionError"]})
+
+    collection.bulk_write = conflict
+    assert purchase_many_in_mongo(collection, {"a": 1, "b": 1}) == ({}, ["a", "b"])
+    assert stock(collection) == {"a": 3, "b": 1}
@@ -0,0 +1,43 @@
+# Sales history: windowed velocity reports, attached to its store once.
+from inventory import ProductStore, report_index, sales_history
+from inventory.product_search import search_index
+from inventory.sales_events import SalesHistory
+
+
+def test_helpers_are_attached_once_per_store():
+    store = ProductStore.from_columns(["a"], [1.0], [1])
+    other = ProductStore.from_columns(["a"], [1.0], [1])
+    for factory in (sales_history, report_index, search_index):
+        assert factory(store) is factory(store)
+        assert factory(store) is not factory(other)
+    assert len(store._listeners) == 3
+
+
+def test_top_sellers_and_running_out_use_the_window_velocity():
+    now = [10000.0]
+    store = ProductStore.from_columns(["a", "b", "c"], [1.0, 1.0, 1.0], [10, 10, 10])
+    history = SalesHistory(store, clock=lambda: now[0])
+    store.subscribe(history)
+    now[0] += 3600
+    store.purchase("a", 4)
+    store.purchase("b", 1)
+    history.record("c", 2, timestamp=0.0)
+    units, per_hour = history.velocity(1800)
+    assert units.tolist() == [4, 1, 0]
+    assert per_hour.tolist() == [8.0, 2.0, 0.0]
+    assert history.top_sellers(1800, 5) == [("a", 4, 8.0, 6, 0.75), ("b", 1, 2.0, 9, 4.5)]
+    assert history.running_out(1800, 1) == [("a", 4, 8.0, 6, 0.75)]
+
+
+def test_rates_cover_only_the_time_since_recording_started():
+    now = [10000.0]
+    store = ProductStore.from_columns(["a"], [1.0], [100])
+    history = SalesHistory(store, clock=lambda: now[0])
+    store.subscribe(history)
+    now[0] += 600
+    store.purchase("a", 5)
+    assert history.covered_seconds(3600) == 600
+    assert history.velocity(3600)[1].tolist() == [30.0]
+    store.clear()
+    now[0] += 60
+    assert history.covered_seconds(3600) == 60
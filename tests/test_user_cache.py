@@ -0,0 +1,61 @@
+# Login cache: TTL expiry, remembered unknown users and invalidation during a lookup.
+from inventory.user_cache import UserCache
+
+
+class Users:
+    name = "test"
+
+
+def make_cache(now):
+    return UserCache(max_entries=2, ttl=300, negative_ttl=30, clock=lambda: now[0])
+
+
+def test_entries_expire_after_the_ttl():
+    now, loads = [0.0], []
+    cache = make_cache(now)
+    load = lambda: loads.append("alice") or {"role": "customer"}
+    assert cache.get(Users, "alice", load) == {"role": "customer"}
+    now[0] = 299
+    assert cache.get(Users, "alice", load) == {"role": "customer"}
+    now[0] = 300
+    cache.get(Users, "alice", load)
+    assert len(loads) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_unknown_users_are_remembered_for_the_negative_ttl():
+    now, loads = [0.0], []
+    cache = make_cache(now)
+    load = lambda: loads.append("bob")
+    assert cache.get(Users, "bob", load) is None
+    now[0] = 29
+    assert cache.get(Users, "bob", load) is None
+    assert (len(loads), cache.negative_hits) == (1, 1)
+    now[0] = 30
+    cache.get(Users, "bob", load)
+    assert len(loads) == 2
+
+
+def test_invalidation_during_a_lookup_is_not_undone():
+    now = [0.0]
+    cache = make_cache(now)
+
+    # The account is created while the lookup is still running: the lookup's stale
+    # "unknown" result must not be cached over the invalidation
+    def load():
+        cache.invalidate(Users, "carol")
+        return None
+
+    assert cache.get(Users, "carol", load) is None
+    assert len(cache) == 0
+    assert cache.get(Users, "carol", lambda: {"role": "customer"}) == {"role": "customer"}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = make_cache([0.0])
+    for name in ("a", "b"):
+        cache.get(Users, name, lambda: {"role": "customer"})
+    cache.get(Users, "a", lambda: None)
+    cache.get(Users, "c", lambda: {"role": "customer"})
+    assert cache.evictions == 1
+    assert cache.get(Users, "a", lambda: None) == {"role": "customer"}
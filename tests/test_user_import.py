@@ -0,0 +1,17 @@
+# Bulk customer import: bad lines are reported, not fatal.
+import io
+
+import mongomock
+
+from inventory.user_import import import_users
+from inventory.user_store import MongoUserStore
+
+
+def test_jsonl_lines_that_are_not_objects_are_reported():
+    collection = mongomock.MongoClient().db.users
+    collection.create_index("username", unique=True)
+    lines = ['{"username": "alice", "password": "a"}', "[1]", '"x"', "3", "{not json", '{"username": "bob", "password": "b"}']
+    report = import_users(io.StringIO("\n".join(lines) + "\n"), MongoUserStore(collection), "jsonl", workers=1)
+    assert report.inserted == 2
+    assert report.failures == [(2, "", "JSON line is not an object."), (3, "", "JSON line is not an object."),
+                               (4, "", "JSON line is not an object."), (5, "", "Invalid JSON line.")]
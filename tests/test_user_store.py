@@ -0,0 +1,46 @@
+# SQLite user store: per-thread connections and chunked lookups.
+import threading
+
+import pytest
+
+from inventory.user_store import SQLITE_MAX_VARIABLES, SQLiteUserStore, UserStore
+
+
+@pytest.fixture
+def users(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / "users.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_user_store_is_abstract():
+    with pytest.raises(TypeError):
+        UserStore()
+
+
+def test_existing_spans_several_queries(users):
+    count = SQLITE_MAX_VARIABLES * 2 + 5
+    inserted, failures = users.insert_many([{"username": f"u{i}", "password": "h", "role": "customer"}
+                                            for i in range(0, count, 2)])
+    assert failures == []
+    assert users.existing(f"u{i}" for i in range(count)) == {f"u{i}" for i in range(0, count, 2)}
+    assert users.existing([]) == set()
+
+
+def test_each_thread_reads_and_writes_on_its_own_connection(users):
+    connections = []
+
+    def register(worker):
+        connections.append(users._connection())
+        for number in range(100):
+            assert users.insert(f"w{worker}-{number}", "h", "customer")
+            assert users.find(f"w{worker}-{number}") == {"password": "h", "role": "customer"}
+
+    threads = [threading.Thread(target=register, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(connection) for connection in connections}) == 4
+    assert len(users.existing(f"w{worker}-{number}" for worker in range(4) for number in range(100))) == 400
+    assert not users.insert("w0-0", "other", "customer")